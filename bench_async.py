@@ -0,0 +1,76 @@
+#compare request throughput of the threadpool and async database paths
+#usage: python bench_async.py [requests] [concurrency] [db_latency_ms]
+#db_latency_ms delays every statement in the thread that runs it, like the
+#round trip to a database server would; the bundled sqlite file has none.
+#raise SWC_DB_POOL_SIZE with it, or both modes just wait on the pool
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from functools import partial
+
+ENDPOINTS = [
+    "/v0/players/?limit=50",
+    "/v0/performances/?limit=200",
+    "/v0/teams/?league_id=5001",
+    "/v0/counts/",
+    "/v0/analytics/top_players/?position=QB",
+]
+
+def add_db_latency(seconds: float):
+    """Make every sqlite connection opened from now on wait seconds per statement"""
+    class SlowCursor(sqlite3.Cursor):
+        def execute(self, *args):
+            time.sleep(seconds)
+            return super().execute(*args)
+
+        def executemany(self, *args):
+            time.sleep(seconds)
+            return super().executemany(*args)
+
+    class SlowConnection(sqlite3.Connection):
+        def cursor(self, factory = SlowCursor):
+            return super().cursor(factory)
+
+    #sqlalchemy's pysqlite dialect connects through sqlite3.dbapi2, aiosqlite through sqlite3
+    sqlite3.connect = sqlite3.dbapi2.connect = partial(sqlite3.connect, factory = SlowConnection)
+
+async def run(requests: int, concurrency: int):
+    """Send requests to the app in process, concurrency at a time, returning requests/sec"""
+    import httpx
+    import main
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app = main.app)
+    async with httpx.AsyncClient(transport = transport, base_url = "http://bench") as client:
+        async def fetch(index):
+            async with semaphore:
+                response = await client.get(ENDPOINTS[index % len(ENDPOINTS)])
+                response.raise_for_status()
+
+        await fetch(0)
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch(index) for index in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    if os.getenv("SWC_BENCH_CHILD"):
+        if latency_ms:
+            add_db_latency(latency_ms / 1000)
+        print(f"{asyncio.run(run(requests, concurrency)):.0f}")
+        sys.exit()
+
+    #each mode runs in its own process because SWC_ASYNC_DB is read at import,
+    #with the response cache off so every request reaches the database
+    for mode, async_db in (("threadpool", "0"), ("async", "1")):
+        env = dict(os.environ, SWC_BENCH_CHILD = "1", SWC_ASYNC_DB = async_db,
+                   SWC_CACHE_MAX_ENTRIES = "0")
+        result = subprocess.run([sys.executable, __file__, str(requests), str(concurrency), str(latency_ms)],
+                                env = env, capture_output = True, text = True, check = True)
+        print(f"{mode}: {result.stdout.strip()} requests/sec "
+              f"({requests} requests, {concurrency} concurrent, {latency_ms:g}ms per statement)")
@@ -0,0 +1,43 @@
+#compare the pydantic and orjson fast paths for the full player and performance lists
+#usage: python bench_json.py [repeats]
+import sys
+import time
+import crud
+import fast_json
+import main
+import schemas
+from database import SessionLocal
+
+def pydantic_performances(db):
+    return main.serialize(list[schemas.Performance], crud.get_performances(db, limit = 20000))
+
+def fast_performances(db):
+    return fast_json.dump_rows(schemas.Performance, crud.get_performances(db, limit = 20000, as_rows = True))
+
+def pydantic_players(db):
+    return main.serialize(list[schemas.Player], crud.get_players(db, limit = 2000))
+
+def fast_players(db):
+    players = crud.get_players(db, limit = 2000, as_rows = True)
+    performances = crud.get_performance_rows_by_player(db, [player.player_id for player in players])
+    return fast_json.dump_rows(schemas.Player, players, "player_id", performances)
+
+def best_time(function, repeats: int) -> float:
+    """Fastest of repeats runs, each on a fresh session so nothing is reused"""
+    times = []
+    for _ in range(repeats):
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            function(db)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, slow, fast in (("performances", pydantic_performances, fast_performances),
+                             ("players", pydantic_players, fast_players)):
+        with SessionLocal() as db:
+            assert slow(db) == fast(db), f"{name} bodies differ"
+        slow_time, fast_time = best_time(slow, repeats), best_time(fast, repeats)
+        print(f"{name}: pydantic {slow_time * 1000:.0f} ms, fast {fast_time * 1000:.0f} ms "
+              f"({slow_time / fast_time:.1f}x)")
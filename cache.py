@@ -0,0 +1,122 @@
+#in-process cache of serialized responses
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+@dataclass
+class CacheEntry:
+    version: tuple
+    body: bytes
+    headers: dict = field(default_factory = dict)
+    expires_at: float = 0.0
+    #compressed copies of body by content coding, added as they are requested
+    encoded: dict = field(default_factory = dict)
+    #hash of body, the base of the ETag of every coding of it
+    digest: str = ""
+
+    @property
+    def size(self) -> int:
+        return (len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+                + sum(len(body) for body in self.encoded.values()))
+
+class ResponseCache:
+    """LRU cache of response bodies with a TTL and a memory cap.
+
+    Every entry carries the data version it was built from; a lookup with a
+    different version counts as an invalidation and drops the entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, version: tuple):
+        """The entry stored for key if it is fresh and built from version, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != version:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, version: tuple, body: bytes, headers: dict = None) -> CacheEntry:
+        """Store a response body, evicting least recently used entries to stay under the caps"""
+        entry = CacheEntry(version, body, dict(headers or {}),
+                           time.monotonic() + self.ttl_seconds,
+                           digest = hashlib.sha256(body).hexdigest()[:32])
+        if entry.size > self.max_bytes or self.max_entries <= 0:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size_bytes += entry.size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def add_encoding(self, key, entry: CacheEntry, encoding: str, body: bytes) -> bytes:
+        """Keep a compressed copy of a cached body, counted against the byte cap"""
+        with self._lock:
+            if encoding in entry.encoded:
+                return entry.encoded[encoding]
+            if self._entries.get(key) is not entry:
+                #evicted or never stored: serve the copy without keeping it
+                return body
+            entry.encoded[encoding] = body
+            self.size_bytes += len(body)
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
@@ -0,0 +1,64 @@
+#negotiated response compression: gzip always, brotli and zstd when their
+#packages (brotli, zstandard) are installed
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#bodies smaller than this are sent as they are
+MIN_SIZE = int(os.getenv("SWC_COMPRESSION_MIN_SIZE", "1024"))
+LEVELS = {
+    "gzip": int(os.getenv("SWC_GZIP_LEVEL", "6")),
+    "br": int(os.getenv("SWC_BROTLI_QUALITY", "5")),
+    "zstd": int(os.getenv("SWC_ZSTD_LEVEL", "3")),
+}
+
+ENCODERS = {"gzip": lambda body, level: gzip.compress(body, compresslevel = level, mtime = 0)}
+if brotli is not None:
+    ENCODERS["br"] = lambda body, level: brotli.compress(body, quality = level)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda body, level: zstandard.ZstdCompressor(level = level).compress(body)
+
+#server preference among codings the client accepts equally
+PREFERENCE = ["zstd", "br", "gzip"]
+
+def parse_accept_encoding(header: str) -> dict:
+    """Quality value of each coding in an Accept-Encoding header"""
+    qualities = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+def choose_encoding(header: str):
+    """Best available coding the client accepts, or None for the identity"""
+    qualities = parse_accept_encoding(header or "")
+    best, best_quality = None, 0.0
+    for coding in PREFERENCE:
+        if coding not in ENCODERS:
+            continue
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    return ENCODERS[encoding](body, LEVELS[encoding])
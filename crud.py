@@ -1,17 +1,72 @@
 #helper function to query the db
+from sqlalchemy import func, literal_column, select, tuple_
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import load_only, selectinload, subqueryload
 from datetime import date
+import database
+import leaderboards
 import models
 
-def get_player(db:Session, player_id :int):
-    return db.query(models.Player).filter(models.Player.player_id == player_id).first()
+#relationships each response model nests, loaded eagerly so that
+#serializing a page does not lazy-load one query per row
+EAGER_LOADS = {
+    models.Player: (models.Player.performances,),
+    models.Team: (models.Team.players,),
+    models.League: (models.League.teams,),
+    models.Performance: (),
+}
+
+#selectinload emits one IN query per batch of parents, so pages larger
+#than a batch load their collections with a single subquery instead
+SELECTIN_BATCH_SIZE = 500
+
+def _query(db:Session, model, limit:int = None, as_rows:bool = False,
+           fields:tuple = None, include:tuple = None):
+    """Query a model with the loading strategy of its response model,
+    or only its plain column tuples when as_rows is set.
+
+    fields narrows the columns loaded and include the relationships eagerly
+    loaded, by name; None loads all of them.
+    """
+    columns = models.data_columns(model.__table__)
+    if fields is not None:
+        columns = [model.__table__.columns[name] for name in fields]
+    if as_rows:
+        return db.query(*columns)
+    relationships = EAGER_LOADS[model]
+    if include is not None:
+        relationships = [getattr(model, name) for name in include]
+    if limit is None or limit <= SELECTIN_BATCH_SIZE:
+        strategy = selectinload
+    else:
+        strategy = subqueryload
+    query = db.query(model).options(*[strategy(relationship) for relationship in relationships])
+    if fields is not None:
+        query = query.options(load_only(*[getattr(model, name) for name in fields]))
+    return query
+
+def _results(query, yield_per:int = None):
+    """All rows as a list, or an iterator fetching yield_per rows at a time"""
+    if yield_per:
+        return iter(query.yield_per(yield_per))
+    return query.all()
+
+#list queries are ordered by primary key, and after_id resumes after the
+#last key of the previous page so deep pages seek instead of scanning
+
+def get_player(db:Session, player_id :int, fields:tuple = None, include:tuple = None):
+    return _query(db, models.Player, fields = fields, include = include).filter(models.Player.player_id == player_id).first()
 
 
 def get_players(db:Session, skip:int=0, limit:int=100,
                 min_last_changed_date: date = None,
-                first_name: str = None, last_name: str = None):
-    query = db.query(models.Player)
+                first_name: str = None, last_name: str = None,
+                after_id: int = None, as_rows: bool = False,
+                yield_per: int = None, fields: tuple = None,
+                include: tuple = None):
+    query = _query(db, models.Player, limit, as_rows, fields, include)
+    if after_id is not None:
+        query = query.filter(models.Player.player_id > after_id)
     if min_last_changed_date:
         query = query.filter(models.Player.last_changed_date >= min_last_changed_date)
     
@@ -21,40 +76,69 @@ def get_players(db:Session, skip:int=0, limit:int=100,
     if last_name:
         query = query.filter(models.Player.last_name == last_name)
 
-    return query.offset(skip).limit(limit).all()
+    query = query.order_by(models.Player.player_id).offset(skip).limit(limit)
+    return _results(query, yield_per)
 
-def get_performance(db:Session, performance_id: int):
-    return db.query(models.Performance).filter(models.Performance.performance_id == performance_id).first()
+def get_performance(db:Session, performance_id: int, fields:tuple = None, include:tuple = None):
+    return _query(db, models.Performance, fields = fields, include = include).filter(models.Performance.performance_id == performance_id).first()
 
 def get_performances(db:Session, skip:int=0, limit:int=100,
-                     min_last_changed_date:date = None):
-    query = db.query(models.Performance)
+                     min_last_changed_date:date = None,
+                     after_id:int = None, as_rows:bool = False,
+                     yield_per:int = None, fields:tuple = None,
+                     include:tuple = None):
+    query = _query(db, models.Performance, limit, as_rows, fields, include)
+
+    if after_id is not None:
+        query = query.filter(models.Performance.performance_id > after_id)
 
     if min_last_changed_date:
         query = query.filter(models.Performance.last_changed_date >= min_last_changed_date)
-    return query.offset(skip).limit(limit).all()
+    query = query.order_by(models.Performance.performance_id).offset(skip).limit(limit)
+    return _results(query, yield_per)
 
-def get_league(db:Session,league_id:int):
-    return db.query(models.League).filter(models.League.league_id == league_id).first()
+def get_performance_rows_by_player(db:Session, player_ids:list):
+    """Performance column tuples of each player, for the nested lists of player rows"""
+    rows = (_query(db, models.Performance, as_rows = True)
+            .filter(models.Performance.player_id.in_(player_ids))
+            .order_by(models.Performance.player_id, models.Performance.performance_id).all())
+    performances = {}
+    for row in rows:
+        performances.setdefault(row.player_id, []).append(row)
+    return performances
+
+def get_league(db:Session,league_id:int, fields:tuple = None, include:tuple = None):
+    return _query(db, models.League, fields = fields, include = include).filter(models.League.league_id == league_id).first()
 
 def get_leagues(db:Session,skip:int = 0, limit:int=100,
-                min_last_changed_date:date = None,league_name:str = None):
-    query = db.query(models.League).options(joinedload(models.League.teams))
+                min_last_changed_date:date = None,league_name:str = None,
+                after_id:int = None, fields:tuple = None,
+                include:tuple = None):
+    query = _query(db, models.League, limit, fields = fields, include = include)
+
+    if after_id is not None:
+        query = query.filter(models.League.league_id > after_id)
 
     if min_last_changed_date:
         query = query.filter(models.League.last_changed_date >= min_last_changed_date)
     if league_name:
         query = query.filter(models.League.league_name == league_name)
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(models.League.league_id).offset(skip).limit(limit).all()
 
-def get_team(db:Session,team_id:int):
-    return db.query(models.Team).filter(models.Team.team_id == team_id).first()
+def get_team(db:Session,team_id:int, fields:tuple = None, include:tuple = None):
+    return _query(db, models.Team, fields = fields, include = include).filter(models.Team.team_id == team_id).first()
 
 def get_teams(db:Session,skip:int=0, limit:int=100,
               min_last_changed_date:date = None,
               team_name:str = None,
-              league_id:int = None):
-    query = db.query(models.Team)
+              league_id:int = None,
+              after_id:int = None,
+              fields:tuple = None,
+              include:tuple = None):
+    query = _query(db, models.Team, limit, fields = fields, include = include)
+
+    if after_id is not None:
+        query = query.filter(models.Team.team_id > after_id)
      
     if min_last_changed_date:
          query = query.filter(models.Team.last_changed_date >= min_last_changed_date)
@@ -65,15 +149,156 @@ def get_teams(db:Session,skip:int=0, limit:int=100,
     if league_id:
         query = query.filter(models.Team.league_id == league_id)
 
-    return query.offset(skip).limit(limit).all()    
+    return query.order_by(models.Team.team_id).offset(skip).limit(limit).all()    
+
+def get_by_ids(db:Session, model, ids:list, fields:tuple = None, include:tuple = None):
+    """Rows of a model with the given primary keys in one IN query,
+    in the order of ids, and the ids that matched no row"""
+    key = getattr(model, model.__table__.primary_key.columns[0].key)
+    rows = {getattr(row, key.key): row
+            for row in _query(db, model, len(ids), fields = fields, include = include)
+            .filter(key.in_(ids))}
+    return [rows[id] for id in ids if id in rows], [id for id in ids if id not in rows]
+
+#change feed queries
+def get_change_keys(model):
+    """Columns ordering a change feed: the change_seq the database bumps on every
+    write, unlike last_changed_date, which is only a day and may go back"""
+    return [model.change_seq]
+
+def get_changes(db:Session, model, limit:int = 100, after:list = None):
+    """Rows in change order, resuming after the change key in after"""
+    keys = get_change_keys(model)
+    query = db.query(model)
+    if after is not None:
+        query = query.filter(tuple_(*keys) > tuple_(*after))
+    return query.order_by(*keys).limit(limit).all()
+
+def get_data_version(db:Session, *model_list):
+    """Change counter of each model's table, which inserts, updates and deletes
+    all move, read from change_sequence in one query"""
+    names = [model.__tablename__ for model in model_list]
+    sequence = models.ChangeSequence
+    values = dict(db.execute(select(sequence.table_name, sequence.value)
+                             .where(sequence.table_name.in_(names))).all())
+    return tuple(values.get(name) for name in names)
+
+def get_database_settings(db:Session):
+    """Dialect, read-only mode and sqlite pragma values of the session's connection"""
+    connection = db.connection()
+    is_sqlite = connection.dialect.name == "sqlite"
+    return {"dialect": connection.dialect.name,
+            "read_only": database.READ_ONLY,
+            "async_db": database.ASYNC_DB,
+            "pragmas": database.get_sqlite_settings(connection) if is_sqlite else {}}
+
+#analytics queries; counting the table directly avoids Query.count()
+#wrapping the whole SELECT in a subquery
+def _count(model):
+    return select(func.count()).select_from(model).scalar_subquery()
 
-#analytics queries
 def get_player_count(db:Session):
-    return db.query(models.Player).count()
+    return db.scalar(select(_count(models.Player)))
 
 def get_team_count(db:Session):
-    return db.query(models.Team).count()
+    return db.scalar(select(_count(models.Team)))
 
 def get_league_count(db:Session):
-    return db.query(models.League).count()
+    return db.scalar(select(_count(models.League)))
+
+COUNTED_MODELS = {
+    "league_count": models.League,
+    "team_count": models.Team,
+    "player_count": models.Player,
+    "performance_count": models.Performance,
+    "team_player_count": models.TeamPlayer,
+}
+
+def get_counts(db:Session):
+    """Row count of every table in COUNTED_MODELS, in one query"""
+    columns = [_count(model).label(name) for name, model in COUNTED_MODELS.items()]
+    return db.execute(select(*columns)).one()._asdict()
+
+#scoring aggregates, computed in the database instead of the client
+def _average(total, games):
+    #total * 1.0 is real on sqlite and numeric on postgresql, which only
+    #rounds numeric values to a number of digits
+    return func.round(total * literal_column("1.0") / games, 2)
+
+def _season_totals_query(db:Session, season:int = None, position:str = None):
+    summary = models.PlayerSeasonSummary
+    query = (db.query(summary.player_id, summary.season, models.Player.position,
+                      summary.games_played, summary.total_points,
+                      _average(summary.total_points, summary.games_played).label("average_points"))
+             .join(models.Player, models.Player.player_id == summary.player_id))
+    if season:
+        query = query.filter(summary.season == season)
+    if position:
+        query = query.filter(models.Player.position == position)
+    return query
+
+def get_player_season_totals(db:Session, player_id:int = None, season:int = None,
+                             position:str = None, skip:int = 0, limit:int = 100):
+    summary = models.PlayerSeasonSummary
+    query = _season_totals_query(db, season = season, position = position)
+    if player_id:
+        query = query.filter(summary.player_id == player_id)
+    return query.order_by(summary.player_id, summary.season).offset(skip).limit(limit).all()
+
+def get_top_players(db:Session, season:int = None, position:str = None, limit:int = 10):
+    summary = models.PlayerSeasonSummary
+    query = _season_totals_query(db, season = season, position = position)
+    return query.order_by(summary.total_points.desc(), summary.player_id).limit(limit).all()
+
+def get_team_season_totals(db:Session, season:int = None, league_id:int = None):
+    summary = models.PlayerSeasonSummary
+    team = models.Team
+    query = (db.query(team.team_id, team.team_name, team.league_id, summary.season,
+                      func.count(summary.player_id).label("player_count"),
+                      func.sum(summary.total_points).label("total_points"))
+             .join(models.TeamPlayer, models.TeamPlayer.team_id == team.team_id)
+             .join(summary, summary.player_id == models.TeamPlayer.player_id))
+    if season:
+        query = query.filter(summary.season == season)
+    if league_id:
+        query = query.filter(team.league_id == league_id)
+    query = query.group_by(team.team_id, team.team_name, team.league_id, summary.season)
+    return query.order_by(team.team_id, summary.season).all()
+
+def get_weekly_averages(db:Session, season:int = None, position:str = None):
+    performance = models.Performance
+    query = db.query(performance.week_number,
+                     func.count().label("performance_count"),
+                     _average(func.sum(performance.fantasy_points), func.count()).label("average_points"))
+    if season:
+        query = query.filter(leaderboards.season_of(performance.week_number) == season)
+    if position:
+        query = (query.join(models.Player, models.Player.player_id == performance.player_id)
+                 .filter(models.Player.position == position))
+    return query.group_by(performance.week_number).order_by(performance.week_number).all()
+
+#leaderboards, read from the tables maintained by leaderboards.py
+def get_league_standings(db:Session, league_id:int, week_number:str = None):
+    score = models.TeamWeekScore
+    points = func.sum(score.points)
+    query = (db.query(func.rank().over(order_by = points.desc()).label("rank"),
+                      score.team_id, models.Team.team_name, points.label("points"))
+             .join(models.Team, models.Team.team_id == score.team_id)
+             .filter(score.league_id == league_id))
+    if week_number:
+        query = query.filter(score.week_number == week_number)
+    query = query.group_by(score.team_id, models.Team.team_name)
+    return query.order_by(points.desc(), score.team_id).all()
 
+def get_position_leaders(db:Session, position:str, week_number:str = None, limit:int = 10):
+    score = models.PlayerWeekScore
+    points = func.sum(score.points)
+    query = (db.query(func.rank().over(order_by = points.desc()).label("rank"),
+                      score.player_id, models.Player.first_name, models.Player.last_name,
+                      score.position, points.label("points"))
+             .join(models.Player, models.Player.player_id == score.player_id)
+             .filter(score.position == position))
+    if week_number:
+        query = query.filter(score.week_number == week_number)
+    query = query.group_by(score.player_id, models.Player.first_name, models.Player.last_name, score.position)
+    return query.order_by(points.desc(), score.player_id).limit(limit).all()
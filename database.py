@@ -1,15 +1,181 @@
 #config the sqlalchemy to use the db
 #create db connection that points to the db and correct settings
 #create a parent class that all models will inherit from
-from sqlalchemy import create_engine
+import itertools
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql.dml import UpdateBase
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./fantasy_football.db"
+#point SWC_DATABASE_URL at a shared server database to run several API replicas
+SQLALCHEMY_DATABASE_URL = os.getenv("SWC_DATABASE_URL", "sqlite:///./fantasy_football.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args = {"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit = False, autoflush = False, bind = engine)
+#connection pool of each engine, sized per process
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("SWC_DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("SWC_DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("SWC_DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("SWC_DB_POOL_RECYCLE", "-1")),
+    "pool_pre_ping": os.getenv("SWC_DB_POOL_PRE_PING", "").lower() in ("1", "true", "yes"),
+}
+
+#set SWC_DB_READ_ONLY=1 on API replicas to open the file read-only
+READ_ONLY = os.getenv("SWC_DB_READ_ONLY", "").lower() in ("1", "true", "yes")
+
+#pragmas applied to every new sqlite connection; override one with
+#SWC_SQLITE_<NAME>, e.g. SWC_SQLITE_MMAP_SIZE=0, or set it to "" to skip it
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          #readers no longer wait on the writer
+    "synchronous": "NORMAL",        #safe with WAL, fsyncs only at checkpoints
+    "cache_size": "-65536",         #64 MiB page cache per connection
+    "mmap_size": str(256 * 1024 * 1024),
+    "temp_store": "MEMORY",
+    "busy_timeout": "5000",         #wait up to 5s for a lock instead of failing
+}
+
+def get_sqlite_pragmas(read_only: bool = False) -> dict:
+    """The pragma profile with SWC_SQLITE_* overrides applied"""
+    pragmas = {name: os.getenv(f"SWC_SQLITE_{name.upper()}", value)
+               for name, value in SQLITE_PRAGMAS.items()}
+    if read_only:
+        #changing the journal mode writes to the file
+        pragmas.pop("journal_mode")
+    return {name: value for name, value in pragmas.items() if value != ""}
+
+def get_read_only_url(url):
+    """A sqlite URL opening the same file with mode=ro"""
+    url = make_url(url)
+    return url.set(database = f"file:{url.database}",
+                   query = {**url.query, "mode": "ro", "uri": "true"})
+
+def set_sqlite_pragmas(engine, pragmas: dict):
+    """Apply pragmas to each connection the engine opens"""
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+def is_memory_url(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def create_db_engine(url, read_only: bool = False, **kwargs):
+    """Engine for url, with the sqlite pragma profile and optional read-only mode.
+
+    Keyword arguments go to create_engine, typically the POOL_OPTIONS. An
+    in-memory sqlite database exists only inside its one connection, so it
+    gets a StaticPool shared by every thread instead.
+    """
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url, **kwargs)
+    if is_memory_url(url):
+        kwargs = {"poolclass": StaticPool}
+    elif read_only:
+        url = get_read_only_url(url)
+    engine = create_engine(url, connect_args = {"check_same_thread": False}, **kwargs)
+    set_sqlite_pragmas(engine, get_sqlite_pragmas(read_only))
+    return engine
+
+def get_sqlite_settings(connection) -> dict:
+    """Current value of each pragma in the profile on a connection"""
+    return {name: str(connection.exec_driver_sql(f"PRAGMA {name}").scalar())
+            for name in SQLITE_PRAGMAS}
+
+#replica routing: with SWC_REPLICA_URLS set to comma separated database URLs,
+#reads go to a replica opened read-only, picked per session by
+#SWC_REPLICA_STRATEGY (round_robin or least_busy), and writes go to the primary
+REPLICA_URLS = [url.strip() for url in os.getenv("SWC_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_STRATEGY = os.getenv("SWC_REPLICA_STRATEGY", "round_robin")
+
+_replica_counter = itertools.count()
+
+def choose_replica(replicas: list, strategy: str = "round_robin"):
+    """Next replica in turn, or the one with the fewest connections checked out"""
+    if strategy == "least_busy":
+        return min(replicas, key = lambda replica: getattr(replica.pool, "checkedout", int)())
+    return replicas[next(_replica_counter) % len(replicas)]
+
+class RoutingSession(Session):
+    """Session reading from one replica and writing to its bind, the primary.
+
+    The replica is chosen on the first read and kept for the session, so a
+    request sees one consistent copy. Once the session writes, every later
+    statement goes to the primary so it reads its own writes.
+    """
+
+    def __init__(self, replicas = (), strategy: str = "round_robin", **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self._replica = None
+        self._wrote = False
+
+    def get_bind(self, mapper = None, clause = None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._wrote = True
+        if self._wrote or not self.replicas:
+            return super().get_bind(mapper, clause = clause, **kwargs)
+        if self._replica is None:
+            self._replica = choose_replica(self.replicas, self.strategy)
+        return self._replica
+
+    def close(self):
+        super().close()
+        self._replica = None
+        self._wrote = False
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL, read_only = READ_ONLY, **POOL_OPTIONS)
+replica_engines = [create_db_engine(url, read_only = True, **POOL_OPTIONS) for url in REPLICA_URLS]
+SessionLocal = sessionmaker(class_ = RoutingSession, autocommit = False, autoflush = False,
+                            bind = engine, replicas = replica_engines, strategy = REPLICA_STRATEGY)
 Base = declarative_base()
 
+@event.listens_for(Session, "after_flush")
+def _maintain_derived_tables(session, flush_context):
+    """Keep the tables derived from performance current on every ORM write,
+    whichever module does the writing"""
+    #imported here because leaderboards imports models, which imports this module
+    import leaderboards
+    leaderboards.update_on_flush(session, flush_context)
+
+#set SWC_ASYNC_DB=1 to run the routes on an async engine instead of the
+#threadpool; needs aiosqlite for sqlite or asyncpg for postgresql. it only
+#pays off when requests mostly wait on a database server: the ORM still
+#builds rows on the event loop, so on the local sqlite file it serves fewer
+#requests per second than the threadpool (see bench_async.py)
+ASYNC_DB = os.getenv("SWC_ASYNC_DB", "").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def get_async_url(url):
+    """The same database URL with the async driver of its dialect"""
+    url = make_url(url)
+    return url.set(drivername = ASYNC_DRIVERS[url.get_backend_name()])
+
+def create_async_db_engine(url, read_only: bool = False, **kwargs):
+    """Async engine for url, configured like create_db_engine"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_async_engine(get_async_url(url), **kwargs)
+    if read_only:
+        url = get_read_only_url(url)
+    async_engine = create_async_engine(
+        get_async_url(url), connect_args = {"check_same_thread": False}, **kwargs
+    )
+    set_sqlite_pragmas(async_engine.sync_engine, get_sqlite_pragmas(read_only))
+    return async_engine
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL, read_only = READ_ONLY, **POOL_OPTIONS)
+    async_replicas = [create_async_db_engine(url, read_only = True, **POOL_OPTIONS).sync_engine
+                      for url in REPLICA_URLS]
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush = False,
+                                           sync_session_class = RoutingSession,
+                                           replicas = async_replicas, strategy = REPLICA_STRATEGY)
@@ -0,0 +1,125 @@
+#load the data/*.csv files into the database in batches
+#usage: python importer.py [database_url] [data_dir]
+import csv
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from sqlalchemy import DATETIME, Integer, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from database import engine
+import leaderboards
+import migrations
+import models
+
+DATA_DIR = Path(__file__).parent / "data"
+BATCH_SIZE = 5000
+
+#parents before children so foreign keys always resolve
+LOAD_ORDER = [
+    ("league_data.csv", models.League),
+    ("team_data.csv", models.Team),
+    ("player_data.csv", models.Player),
+    ("team_player_data.csv", models.TeamPlayer),
+    ("performance_data.csv", models.Performance),
+]
+
+#durability is not needed while a load runs in one transaction
+LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",
+}
+
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+@lru_cache(maxsize = 4096)
+def parse_date(value: str) -> datetime:
+    """Parse a CSV date; the files repeat a handful of dates, so each is parsed once"""
+    return datetime.fromisoformat(value)
+
+def get_converters(table, header):
+    """Converter per CSV column, taken from the column types of the table"""
+    converters = []
+    for name in header:
+        column_type = table.columns[name].type
+        if isinstance(column_type, DATETIME):
+            converters.append(parse_date)
+        elif isinstance(column_type, Integer):
+            converters.append(int)
+        else:
+            converters.append(str)
+    return converters
+
+def read_batches(path, table, batch_size = BATCH_SIZE):
+    """Yield lists of row dicts from a CSV file, batch_size rows at a time"""
+    with open(path, newline = "") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        converters = get_converters(table, header)
+        while True:
+            rows = [{name: convert(value) for name, convert, value in zip(header, converters, row)}
+                    for row in islice(reader, batch_size)]
+            if not rows:
+                break
+            yield rows
+
+def upsert_statement(bind, table):
+    """INSERT ... ON CONFLICT DO UPDATE for the primary key of table"""
+    insert = UPSERT_DIALECTS[bind.dialect.name](table)
+    primary_key = [column.name for column in table.primary_key]
+    updates = {column.name: insert.excluded[column.name]
+               for column in models.data_columns(table) if column.name not in primary_key}
+    return insert.on_conflict_do_update(index_elements = primary_key, set_ = updates)
+
+def set_pragmas(connection, pragmas):
+    """Apply pragmas to a SQLite connection, returning the values they replaced"""
+    previous = {}
+    for name, value in pragmas.items():
+        previous[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+    connection.commit()
+    return previous
+
+def load_batches(bind, sources):
+    """Upsert (table, batches) pairs in one transaction, returning rows loaded per table"""
+    counts = {}
+    with bind.connect() as connection:
+        is_sqlite = bind.dialect.name == "sqlite"
+        previous = set_pragmas(connection, LOAD_PRAGMAS) if is_sqlite else {}
+        try:
+            with connection.begin():
+                for table, batches in sources:
+                    statement = upsert_statement(bind, table)
+                    counts[table.name] = 0
+                    for rows in batches:
+                        connection.execute(statement, rows)
+                        counts[table.name] += len(rows)
+                #the load bypasses the ORM events that keep the leaderboards current
+                leaderboards.rebuild(connection)
+        finally:
+            if previous:
+                set_pragmas(connection, previous)
+    return counts
+
+def load_all(bind = engine, data_dir = DATA_DIR, batch_size = BATCH_SIZE):
+    """Upsert every CSV in data_dir, returning rows loaded per table"""
+    data_dir = Path(data_dir)
+    sources = ((model.__table__, read_batches(data_dir / file_name, model.__table__, batch_size))
+               for file_name, model in LOAD_ORDER if (data_dir / file_name).exists())
+    return load_batches(bind, sources)
+
+if __name__ == "__main__":
+    bind = create_engine(sys.argv[1]) if len(sys.argv) > 1 else engine
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else DATA_DIR
+    migrations.upgrade(bind)
+    start = time.perf_counter()
+    counts = load_all(bind, data_dir)
+    elapsed = time.perf_counter() - start
+    for table_name, rows in counts.items():
+        print(f"{table_name}: {rows} rows")
+    total = sum(counts.values())
+    print(f"Loaded {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/sec)")
@@ -0,0 +1,168 @@
+#materialized leaderboard and season summary tables, kept current as
+#performances are written through the ORM (database.py calls update_on_flush
+#after every flush); bulk loads that bypass it call rebuild() instead
+from collections import defaultdict
+from sqlalchemy import Integer, cast, delete, func, insert, literal_column, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import get_history
+import models
+
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+player_week_score = models.PlayerWeekScore.__table__
+team_week_score = models.TeamWeekScore.__table__
+performance = models.Performance.__table__
+team_player = models.TeamPlayer.__table__
+player_season_summary = models.PlayerSeasonSummary.__table__
+
+def season_of(week_number):
+    """Season of a week_number such as 202301"""
+    #literal arguments, so postgresql sees the same expression in SELECT and GROUP BY
+    return cast(func.substr(week_number, literal_column("1"), literal_column("4")), Integer)
+
+def _player_week_rows():
+    return (select(performance.c.player_id, performance.c.week_number,
+                   models.Player.position, func.count(), func.sum(performance.c.fantasy_points))
+            .join(models.Player, models.Player.player_id == performance.c.player_id)
+            .group_by(performance.c.player_id, performance.c.week_number, models.Player.position))
+
+def _team_week_rows():
+    return (select(team_player.c.team_id, performance.c.week_number,
+                   models.Team.league_id, func.count(), func.sum(performance.c.fantasy_points))
+            .join(performance, performance.c.player_id == team_player.c.player_id)
+            .join(models.Team, models.Team.team_id == team_player.c.team_id)
+            .group_by(team_player.c.team_id, performance.c.week_number, models.Team.league_id))
+
+def _season_summary_rows():
+    season = season_of(performance.c.week_number)
+    return (select(performance.c.player_id, season, func.count(),
+                   func.sum(performance.c.fantasy_points), func.max(performance.c.last_changed_date))
+            .group_by(performance.c.player_id, season))
+
+def rebuild_season_summary(connection, player_ids = None):
+    """Recompute the season summary from scratch, or only the given players' seasons"""
+    rows = _season_summary_rows()
+    if player_ids is None:
+        connection.execute(delete(player_season_summary))
+    else:
+        rows = rows.where(performance.c.player_id.in_(player_ids))
+        connection.execute(delete(player_season_summary)
+                           .where(player_season_summary.c.player_id.in_(player_ids)))
+    connection.execute(insert(player_season_summary).from_select(
+        ["player_id", "season", "games_played", "total_points", "last_changed_date"], rows))
+
+def rebuild(connection, team_ids = None):
+    """Recompute the leaderboards and season summary from scratch, or only the
+    leaderboard rows of the given teams"""
+    team_rows = _team_week_rows()
+    if team_ids is None:
+        rebuild_season_summary(connection)
+        connection.execute(delete(player_week_score))
+        connection.execute(insert(player_week_score).from_select(
+            ["player_id", "week_number", "position", "performance_count", "points"],
+            _player_week_rows()))
+        connection.execute(delete(team_week_score))
+    else:
+        team_rows = team_rows.where(team_player.c.team_id.in_(team_ids))
+        connection.execute(delete(team_week_score).where(team_week_score.c.team_id.in_(team_ids)))
+    connection.execute(insert(team_week_score).from_select(
+        ["team_id", "week_number", "league_id", "performance_count", "points"], team_rows))
+
+def _add(connection, table, key_columns, rows):
+    """Add each row's performance_count and points to the stored row, inserting if absent"""
+    if not rows:
+        return
+    statement = UPSERT_DIALECTS[connection.dialect.name](table)
+    statement = statement.on_conflict_do_update(index_elements = key_columns, set_ = {
+        "performance_count": table.c.performance_count + statement.excluded.performance_count,
+        "points": table.c.points + statement.excluded.points,
+    })
+    connection.execute(statement, rows)
+    #only rows that lost performances can have dropped to zero
+    emptied = [tuple(row[name] for name in key_columns) for row in rows if row["performance_count"] < 0]
+    if emptied:
+        keys = tuple_(*[table.c[name] for name in key_columns])
+        connection.execute(delete(table).where(keys.in_(emptied), table.c.performance_count <= 0))
+
+def apply_deltas(connection, deltas):
+    """Apply {(player_id, week_number): [count, points]} changes to both leaderboards"""
+    deltas = {key: value for key, value in deltas.items() if value != [0, 0]}
+    if not deltas:
+        return
+    player_ids = {player_id for player_id, _ in deltas}
+    positions = dict(connection.execute(
+        select(models.Player.player_id, models.Player.position)
+        .where(models.Player.player_id.in_(player_ids))).all())
+    _add(connection, player_week_score, ["player_id", "week_number"], [
+        {"player_id": player_id, "week_number": week_number, "position": positions[player_id],
+         "performance_count": count, "points": points}
+        for (player_id, week_number), (count, points) in deltas.items()
+        if player_id in positions])
+
+    teams = defaultdict(list)
+    for team_id, league_id, player_id in connection.execute(
+            select(team_player.c.team_id, models.Team.league_id, team_player.c.player_id)
+            .join(models.Team, models.Team.team_id == team_player.c.team_id)
+            .where(team_player.c.player_id.in_(player_ids))):
+        teams[player_id].append((team_id, league_id))
+    team_deltas = defaultdict(lambda: [0, 0])
+    for (player_id, week_number), (count, points) in deltas.items():
+        for team_id, league_id in teams[player_id]:
+            team_delta = team_deltas[team_id, week_number, league_id]
+            team_delta[0] += count
+            team_delta[1] += points
+    _add(connection, team_week_score, ["team_id", "week_number"], [
+        {"team_id": team_id, "week_number": week_number, "league_id": league_id,
+         "performance_count": count, "points": points}
+        for (team_id, week_number, league_id), (count, points) in team_deltas.items()])
+
+def _previous(instance, name):
+    """Value of an attribute before the flush"""
+    history = get_history(instance, name)
+    return history.deleted[0] if history.deleted else getattr(instance, name)
+
+def update_on_flush(session, flush_context):
+    deltas = defaultdict(lambda: [0, 0])
+    changed_teams = set()
+    for instance in session.new:
+        if isinstance(instance, models.Performance):
+            delta = deltas[instance.player_id, instance.week_number]
+            delta[0] += 1
+            delta[1] += instance.fantasy_points
+        elif isinstance(instance, models.TeamPlayer):
+            changed_teams.add(instance.team_id)
+    for instance in session.deleted:
+        if isinstance(instance, models.Performance):
+            delta = deltas[_previous(instance, "player_id"), _previous(instance, "week_number")]
+            delta[0] -= 1
+            delta[1] -= _previous(instance, "fantasy_points")
+        elif isinstance(instance, models.TeamPlayer):
+            changed_teams.add(_previous(instance, "team_id"))
+    for instance in session.dirty:
+        if isinstance(instance, models.Performance) and session.is_modified(instance):
+            old = deltas[_previous(instance, "player_id"), _previous(instance, "week_number")]
+            old[0] -= 1
+            old[1] -= _previous(instance, "fantasy_points")
+            new = deltas[instance.player_id, instance.week_number]
+            new[0] += 1
+            new[1] += instance.fantasy_points
+        elif isinstance(instance, models.TeamPlayer) and session.is_modified(instance):
+            changed_teams.update({_previous(instance, "team_id"), instance.team_id})
+        elif isinstance(instance, models.Team) and get_history(instance, "league_id").deleted:
+            changed_teams.add(instance.team_id)
+        elif isinstance(instance, models.Player) and get_history(instance, "position").deleted:
+            session.connection().execute(
+                player_week_score.update()
+                .where(player_week_score.c.player_id == instance.player_id)
+                .values(position = instance.position))
+    if not deltas and not changed_teams:
+        return
+
+    connection = session.connection()
+    if deltas:
+        #a player's seasons are few rows over indexed performances, so recompute them
+        rebuild_season_summary(connection, player_ids = {player_id for player_id, _ in deltas})
+    apply_deltas(connection, deltas)
+    if changed_teams:
+        #membership changes move every week of a player, so recompute those teams
+        rebuild(connection, team_ids = changed_teams)
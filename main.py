@@ -1,11 +1,79 @@
-from fastapi import Depends,FastAPI,HTTPException, Query
+from fastapi import Depends,FastAPI,HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from datetime import date 
-import crud,schemas 
+#await_only rather than await_, which sqlalchemy 2.0 does not have
+from sqlalchemy.util import await_only
+from contextvars import ContextVar
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+from functools import lru_cache, wraps
+from itertools import islice
+from pathlib import Path
+import inspect
+import orjson
+import os
+import tempfile
+import cache,compress,crud,database,fast_json,models,schemas,pagination,parquet_io
 from database import SessionLocal
 
 app = FastAPI()
 
+#response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+#serialized list and count responses, reused until the tables behind them change
+response_cache = cache.ResponseCache(
+    max_entries = int(os.getenv("SWC_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes = int(os.getenv("SWC_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds = float(os.getenv("SWC_CACHE_TTL_SECONDS", "300")),
+)
+CACHE_STATUS_HEADER = "X-Cache"
+
+#set SWC_FAST_JSON=1 to encode the large player and performance lists from
+#column tuples with orjson instead of validating a pydantic model per row
+FAST_JSON = os.getenv("SWC_FAST_JSON", "").lower() in ("1", "true", "yes")
+
+#streamed list responses: one json object per line, fetched and written in batches
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+#list routes answer with NDJSON or json depending on Accept as well
+LIST_VARY = "Accept, Accept-Encoding"
+STREAM_BATCH_SIZE = 1000
+
+#batch lookups take up to this many comma separated ids
+MAX_BATCH_IDS = 1000
+
+#change feeds return between 1 and this many rows per call
+MAX_CHANGES_LIMIT = 10000
+
+#cached json bodies are compressed in cached_response, which keeps the
+#compressed copy with the entry; the middleware gzips everything else,
+#like streams, and leaves already encoded bodies alone. bulk files are
+#sent as they are: the middleware would keep their identity ETag on the
+#gzipped copy and gzip Range responses too
+app.add_middleware(GZipMiddleware, minimum_size = compress.MIN_SIZE,
+                   compresslevel = compress.LEVELS["gzip"],
+                   exclude_content_types = (*DEFAULT_EXCLUDED_CONTENT_TYPES, "text/csv",
+                                            "application/vnd.apache.parquet"))
+
+#bulk files: the csv files under data/ and parquet exports of the tables
+DATA_DIR = Path(__file__).parent / "data"
+BULK_CACHE_DIR = Path(os.getenv("SWC_BULK_CACHE_DIR",
+                                os.path.join(tempfile.gettempdir(), "swc_bulk")))
+BULK_FILE_MODELS = {
+    "player_data": models.Player,
+    "league_data": models.League,
+    "performance_data": models.Performance,
+    "team_data": models.Team,
+    "team_player_data": models.TeamPlayer,
+}
+BULK_FILE_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
 def get_db():
     db = SessionLocal()
     try:
@@ -13,22 +81,296 @@ def get_db():
     finally:
         db.close()
 
+#set while a route body runs inside AsyncSession.run_sync, on the event loop
+on_event_loop = ContextVar("on_event_loop", default = False)
+
+def off_loop(function, *args):
+    """Call function in the threadpool when the caller is on the event loop,
+    so an async route only keeps database I/O there; a plain call otherwise"""
+    if not on_event_loop.get():
+        return function(*args)
+    return await_only(run_in_threadpool(function, *args))
+
+def db_route(route):
+    """Serve a route from an AsyncSession when database.ASYNC_DB is set.
+
+    The route body and crud functions run unchanged through run_sync, which
+    hands them a sync Session whose I/O awaits the async driver, so requests
+    wait on the database without holding a threadpool worker. The body runs
+    on the event loop, so its serializing and compressing goes through
+    off_loop; building ORM rows from results still happens on the loop, so
+    this is slower than the threadpool unless the database is slow to
+    answer. Without ASYNC_DB the route is returned as is and runs in the
+    threadpool.
+    """
+    if not database.ASYNC_DB:
+        return route
+    signature = inspect.signature(route)
+
+    def run(db, kwargs):
+        token = on_event_loop.set(True)
+        try:
+            return route(db = db, **kwargs)
+        finally:
+            on_event_loop.reset(token)
+
+    @wraps(route)
+    async def async_route(**kwargs):
+        async with database.AsyncSessionLocal() as session:
+            return await session.run_sync(run, kwargs)
+
+    async_route.__signature__ = signature.replace(
+        parameters = [parameter for name, parameter in signature.parameters.items() if name != "db"])
+    return async_route
+
+def get_after_id(cursor: str = Query(None, description = "Opaque cursor returned in the X-Next-Cursor header of the previous page")):
+    if cursor is None:
+        return None
+    try:
+        (after_id,) = pagination.decode_cursor(cursor)
+    except ValueError:
+        after_id = None
+    if not isinstance(after_id, int):
+        raise HTTPException(status_code = 400,
+                            detail = "Invalid cursor")
+    return after_id
+
+def get_fieldset(fields: str = Query(None, description = "Comma separated columns to return, all when unset"),
+                 include: str = Query(None, description = "Comma separated nested collections to embed, all unless fields is set")):
+    def split(value):
+        return None if value is None else tuple(name.strip() for name in value.split(",") if name.strip())
+    return split(fields), split(include)
+
+def sparse(model, response_model, fieldset: tuple):
+    """Response model and the columns and relationships to load for a fieldset;
+    the whole response model, loading everything, when neither was given"""
+    fields, include = fieldset
+    if fields is None and include is None:
+        return response_model, None, None
+    columns = [column.name for column in models.data_columns(model.__table__)]
+    relationships = [relationship.key for relationship in crud.EAGER_LOADS[model]]
+    fields = fields or tuple(columns)
+    include = include or ()
+    unknown = ([name for name in fields if name not in columns] +
+               [name for name in include if name not in relationships])
+    if unknown:
+        raise HTTPException(status_code = 400,
+                            detail = f"Unknown fields: {', '.join(unknown)}")
+    names = tuple(name for name in response_model.model_fields if name in fields or name in include)
+    #the primary key is always loaded, for cursors and nested collections
+    key = model.__table__.primary_key.columns.keys()[0]
+    return (schemas.get_sparse_model(response_model, names),
+            tuple(dict.fromkeys((key, *fields))), include)
+
+def next_cursor_headers(items: list, limit: int, key: str) -> dict:
+    #a full page means there may be more rows after the last key
+    if items and len(items) == limit:
+        return {NEXT_CURSOR_HEADER: pagination.encode_cursor(getattr(items[-1], key))}
+    return {}
+
+@lru_cache
+def get_type_adapter(response_model):
+    return TypeAdapter(response_model)
+
+def _serialize(response_model, content) -> bytes:
+    adapter = get_type_adapter(response_model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes = True))
+
+def serialize(response_model, content) -> bytes:
+    return off_loop(_serialize, response_model, content)
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    """Whether a list call asked for NDJSON, by ?stream=true or its Accept header"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def stream_response(response_model, get_rows, key: str = None, get_children = None):
+    """NDJSON response written batch by batch as the query yields rows.
+
+    The rows are read on a session of the stream's own, since the request's
+    session is closed once the route returns. get_children(db, keys) fills a
+    nested list, like the performances of each player, one batch at a time.
+    """
+    encode = fast_json.get_row_encoder(response_model)
+
+    def lines():
+        with SessionLocal() as db:
+            rows = get_rows(db)
+            while batch := list(islice(rows, STREAM_BATCH_SIZE)):
+                if get_children is None:
+                    items = [encode(row) for row in batch]
+                else:
+                    children = get_children(db, [getattr(row, key) for row in batch])
+                    items = [encode(row, children.get(getattr(row, key), ())) for row in batch]
+                yield b"".join(orjson.dumps(item) + b"\n" for item in items)
+
+    return StreamingResponse(lines(), media_type = NDJSON_MEDIA_TYPE, headers = {"Vary": "Accept"})
+
+def entity_tag(entry: cache.CacheEntry, encoding: str = None) -> str:
+    """ETag of a cached body, or of its copy in a content coding"""
+    return f'"{entry.digest}"' if encoding is None else f'"{entry.digest}-{encoding}"'
+
+def is_not_modified(request: Request, validators: dict) -> bool:
+    """Whether a conditional request already holds the current representation"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or validators["ETag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in validators:
+        try:
+            return (parsedate_to_datetime(if_modified_since)
+                    >= parsedate_to_datetime(validators["Last-Modified"]))
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def cached_response(request: Request, db: Session, key: tuple, tables: tuple, build,
+                    vary: str = "Accept-Encoding") -> Response:
+    """Serve the cached body for key, calling build() for (body, headers) on a miss.
+
+    The ETag is a hash of the body. A conditional request whose tag matches
+    the entry cached at the current data version gets a 304 before anything
+    is loaded or serialized; otherwise the body is built and then compared,
+    so If-None-Match: * only matches a resource that exists.
+    """
+    version = crud.get_data_version(db, *tables)
+    entry = response_cache.get(key, version)
+    status = "HIT"
+    if entry is None:
+        body, headers = build()
+        #set hashes the body for its ETag
+        entry = off_loop(response_cache.set, key, version, body, headers)
+        status = "MISS"
+    #each coding is its own representation, so it gets its own ETag
+    encoding = compress.choose_encoding(request.headers.get("accept-encoding"))
+    if len(entry.body) < compress.MIN_SIZE:
+        encoding = None
+    validators = {"ETag": entity_tag(entry, encoding), "Vary": vary}
+    if is_not_modified(request, validators):
+        return Response(status_code = 304, headers = validators)
+
+    headers = {**entry.headers, **validators, CACHE_STATUS_HEADER: status}
+    body = entry.body
+    if encoding is not None:
+        body = entry.encoded.get(encoding) or response_cache.add_encoding(
+            key, entry, encoding, off_loop(compress.compress, body, encoding))
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type = "application/json", headers = headers)
+
+def get_ids(ids: str = Query(..., description = f"Comma separated IDs, at most {MAX_BATCH_IDS}")):
+    try:
+        #repeated ids are looked up and reported once
+        ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code = 400,
+                            detail = "Invalid ids")
+    if not ids or len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code = 400,
+                            detail = f"Between 1 and {MAX_BATCH_IDS} ids are allowed")
+    return ids
+
+def read_batch(request: Request, db: Session, model, response_model, ids: list, fieldset: tuple, tables: tuple):
+    response_model, fields, include = sparse(model, response_model, fieldset)
+
+    def build():
+        items, not_found = crud.get_by_ids(db, model, ids, fields = fields, include = include)
+        return serialize(schemas.Batch[response_model], {"items": items, "not_found": not_found}), {}
+
+    key = ("batch", model.__tablename__, tuple(ids), fieldset)
+    return cached_response(request, db, key, tables, build)
+
+def decode_watermark(watermark: str, model):
+    if watermark is None:
+        return None
+    try:
+        values = pagination.decode_cursor(watermark)
+        #watermarks from before change_seq held a date and a key, and sync again from the start
+        if len(values) > 1 and isinstance(values[0], str):
+            datetime.fromisoformat(values[0])
+            return None
+        if len(values) != len(crud.get_change_keys(model)) or not all(type(value) is int for value in values):
+            raise ValueError(watermark)
+        return values
+    except (ValueError, TypeError):
+        raise HTTPException(status_code = 400,
+                            detail = "Invalid watermark")
+
+def read_changes(request: Request, db: Session, model, response_model, watermark: str, limit: int):
+    def build():
+        after = decode_watermark(watermark, model)
+        rows = crud.get_changes(db, model, limit = limit, after = after)
+        next_watermark = watermark
+        if rows:
+            last = rows[-1]
+            next_watermark = pagination.encode_cursor(*[getattr(last, column.key)
+                                                        for column in crud.get_change_keys(model)])
+        feed = {"items": rows,
+                "next_watermark": next_watermark,
+                "has_more": len(rows) == limit}
+        return serialize(response_model, feed), {}
+
+    key = ("changes", model.__tablename__, watermark, limit)
+    return cached_response(request, db, key, (model,), build)
+
 @app.get("/",tags = ["analytics"])
 async def root():
     return {"message": "API health check successful"}
 
 @app.get("/v0/players/", response_model = list[schemas.Player],
          tags = ["player"])
-def read_players(skip:int = Query(0,description = "The skip at the beginning of API call"), 
+@db_route
+def read_players(request: Request,
+                 skip:int = Query(0,description = "The skip at the beginning of API call"), 
                  limit:int = Query(100,description = "The maximum number of players to return"),
                  min_last_changed_date: date = None,
                  first_name: str = None, last_name: str = None,
+                 after_id: int = Depends(get_after_id),
+                 stream: bool = False,
+                 fieldset: tuple = Depends(get_fieldset),
                  db:Session = Depends(get_db)):
-    players = crud.get_players(db,skip = skip, limit = limit,
-                               min_last_changed_date = min_last_changed_date,
-                               first_name = first_name,
-                               last_name = last_name)
-    return players
+    response_model, fields, include = sparse(models.Player, schemas.Player, fieldset)
+    #column rows get their nested performances only when they were asked for
+    get_children = None
+    if include is None or "performances" in include:
+        get_children = crud.get_performance_rows_by_player
+
+    if wants_stream(request, stream):
+        return stream_response(response_model, lambda db: crud.get_players(
+            db, skip = skip, limit = limit,
+            min_last_changed_date = min_last_changed_date,
+            first_name = first_name, last_name = last_name,
+            after_id = after_id, as_rows = True, yield_per = STREAM_BATCH_SIZE,
+            fields = fields),
+            "player_id", get_children)
+
+    def build():
+        players = crud.get_players(db,skip = skip, limit = limit,
+                                   min_last_changed_date = min_last_changed_date,
+                                   first_name = first_name,
+                                   last_name = last_name,
+                                   after_id = after_id,
+                                   as_rows = FAST_JSON,
+                                   fields = fields,
+                                   include = include)
+        if FAST_JSON:
+            performances = None
+            if get_children:
+                performances = get_children(db, [player.player_id for player in players])
+            body = off_loop(fast_json.dump_rows, response_model, players, "player_id", performances)
+        else:
+            body = serialize(list[response_model], players)
+        return body, next_cursor_headers(players, limit, "player_id")
+
+    key = ("players", skip, limit, min_last_changed_date, first_name, last_name, after_id, fieldset)
+    return cached_response(request, db, key, (models.Player, models.Performance), build, vary = LIST_VARY)
+
+@app.get("/v0/players/batch/", response_model = schemas.Batch[schemas.Player],
+         tags = ["player"])
+@db_route
+def read_players_batch(request: Request, ids: list = Depends(get_ids),
+                       fieldset: tuple = Depends(get_fieldset), db:Session = Depends(get_db)):
+    return read_batch(request, db, models.Player, schemas.Player, ids, fieldset,
+                      (models.Player, models.Performance))
 
 @app.get("/v0/players/{player_id}",
         response_model = schemas.Player,
@@ -36,89 +378,373 @@ def read_players(skip:int = Query(0,description = "The skip at the beginning of
         description="Retrieve a player's details using their unique player ID.",
         response_description="A JSON object containing the player's details.",
         operation_id="getPlayerById")
-def read_player(db:Session = Depends(get_db), player_id:int = None):
-    player = crud.get_player(db, player_id = player_id)
+@db_route
+def read_player(request: Request, db:Session = Depends(get_db), player_id:int = None,
+                fieldset: tuple = Depends(get_fieldset)):
+    response_model, fields, include = sparse(models.Player, schemas.Player, fieldset)
 
-    if player is None:
-        raise HTTPException(status_code = 404, 
-                            detail = "Player not found")
-    return player
+    def build():
+        player = crud.get_player(db, player_id = player_id, fields = fields, include = include)
+
+        if player is None:
+            raise HTTPException(status_code = 404, 
+                                detail = "Player not found")
+        return serialize(response_model, player), {}
+
+    return cached_response(request, db, ("player", player_id, fieldset), (models.Player, models.Performance), build)
 
 @app.get("/v0/performances/", response_model = list[schemas.Performance],
          tags = ["scoring"])
-def read_performances(db:Session = Depends(get_db),
+@db_route
+def read_performances(request: Request,
+                      db:Session = Depends(get_db),
                       skip:int = 0, limit:int = 100,
-                      min_last_changed_date: date = None):
-    performances = crud.get_performances(db, skip = skip,
-                                        limit = limit,
-                                        min_last_changed_date = min_last_changed_date)
-    return performances
+                      min_last_changed_date: date = None,
+                      after_id: int = Depends(get_after_id),
+                      stream: bool = False,
+                      fieldset: tuple = Depends(get_fieldset)):
+    response_model, fields, include = sparse(models.Performance, schemas.Performance, fieldset)
+    if wants_stream(request, stream):
+        return stream_response(response_model, lambda db: crud.get_performances(
+            db, skip = skip, limit = limit,
+            min_last_changed_date = min_last_changed_date,
+            after_id = after_id, as_rows = True, yield_per = STREAM_BATCH_SIZE,
+            fields = fields))
+
+    def build():
+        performances = crud.get_performances(db, skip = skip,
+                                            limit = limit,
+                                            min_last_changed_date = min_last_changed_date,
+                                            after_id = after_id,
+                                            as_rows = FAST_JSON,
+                                            fields = fields,
+                                            include = include)
+        if FAST_JSON:
+            body = off_loop(fast_json.dump_rows, response_model, performances)
+        else:
+            body = serialize(list[response_model], performances)
+        return body, next_cursor_headers(performances, limit, "performance_id")
+
+    key = ("performances", skip, limit, min_last_changed_date, after_id, fieldset)
+    return cached_response(request, db, key, (models.Performance,), build, vary = LIST_VARY)
+
+@app.get("/v0/performances/batch/", response_model = schemas.Batch[schemas.Performance],
+         tags = ["scoring"])
+@db_route
+def read_performances_batch(request: Request, ids: list = Depends(get_ids),
+                            fieldset: tuple = Depends(get_fieldset), db:Session = Depends(get_db)):
+    return read_batch(request, db, models.Performance, schemas.Performance, ids, fieldset,
+                      (models.Performance,))
 
 @app.get("/v0/performances/{performance_id}", response_model = schemas.Performance,
         tags = ["scoring"])
-def read_performance(db:Session = Depends(get_db), performance_id:int = None):
-    performance = crud.get_performance(db, performance_id = performance_id)
+@db_route
+def read_performance(request: Request, db:Session = Depends(get_db), performance_id:int = None,
+                     fieldset: tuple = Depends(get_fieldset)):
+    response_model, fields, include = sparse(models.Performance, schemas.Performance, fieldset)
 
-    if performance is None:
-        raise HTTPException(status_code = 404,
-                            detail = "Performance not found")
-    return performance
+    def build():
+        performance = crud.get_performance(db, performance_id = performance_id,
+                                           fields = fields, include = include)
+
+        if performance is None:
+            raise HTTPException(status_code = 404,
+                                detail = "Performance not found")
+        return serialize(response_model, performance), {}
+
+    return cached_response(request, db, ("performance", performance_id, fieldset), (models.Performance,), build)
 
 @app.get("/v0/leagues/", response_model = list[schemas.League],
          tags = ["membership"])
-def read_leagues(db:Session = Depends(get_db),
+@db_route
+def read_leagues(request: Request,
+                    db:Session = Depends(get_db),
                     skip:int = 0, limit:int = 100,
                     min_last_changed_date: date = None,
-                    league_name: str = None):
-        leagues = crud.get_leagues(db, skip = skip,
-                                limit = limit,
-                                min_last_changed_date = min_last_changed_date,
-                                league_name = league_name)
-        return leagues
+                    league_name: str = None,
+                    after_id: int = Depends(get_after_id),
+                    fieldset: tuple = Depends(get_fieldset)):
+        response_model, fields, include = sparse(models.League, schemas.League, fieldset)
+
+        def build():
+            leagues = crud.get_leagues(db, skip = skip,
+                                    limit = limit,
+                                    min_last_changed_date = min_last_changed_date,
+                                    league_name = league_name,
+                                    after_id = after_id,
+                                    fields = fields,
+                                    include = include)
+            return (serialize(list[response_model], leagues),
+                    next_cursor_headers(leagues, limit, "league_id"))
+
+        key = ("leagues", skip, limit, min_last_changed_date, league_name, after_id, fieldset)
+        return cached_response(request, db, key, (models.League, models.Team), build)
+
+@app.get("/v0/leagues/batch/", response_model = schemas.Batch[schemas.League],
+         tags = ["membership"])
+@db_route
+def read_leagues_batch(request: Request, ids: list = Depends(get_ids),
+                       fieldset: tuple = Depends(get_fieldset), db:Session = Depends(get_db)):
+    return read_batch(request, db, models.League, schemas.League, ids, fieldset,
+                      (models.League, models.Team))
 
 @app.get("/v0/leagues/{league_id}", response_model = schemas.League,
          tags = ["membership"])
-def read_league(db:Session = Depends(get_db), league_id: int = None):
-    league = crud.get_league(db,league_id = league_id)
+@db_route
+def read_league(request: Request, db:Session = Depends(get_db), league_id: int = None,
+                fieldset: tuple = Depends(get_fieldset)):
+    response_model, fields, include = sparse(models.League, schemas.League, fieldset)
 
-    if league is None:
-        raise HTTPException(status_code = 404,
-                            detail = "League not found")
-    return league
+    def build():
+        league = crud.get_league(db,league_id = league_id, fields = fields, include = include)
+
+        if league is None:
+            raise HTTPException(status_code = 404,
+                                detail = "League not found")
+        return serialize(response_model, league), {}
+
+    return cached_response(request, db, ("league", league_id, fieldset), (models.League, models.Team), build)
 
 @app.get("/v0/teams/", response_model = list[schemas.Team],
          tags=["membership"])
-def read_teams(db:Session = Depends(get_db), skip:int=0, limit:int=100,
+@db_route
+def read_teams(request: Request,
+              db:Session = Depends(get_db), skip:int=0, limit:int=100,
               min_last_changed_date:date = None,
               team_name:str = None,
-              league_id:int = None):
-    teams = crud.get_teams(db, skip = skip,
-                           limit = limit,
-                           min_last_changed_date = min_last_changed_date,
-                           team_name = team_name,
-                           league_id = league_id)
-    return teams
+              league_id:int = None,
+              after_id: int = Depends(get_after_id),
+              fieldset: tuple = Depends(get_fieldset)):
+    response_model, fields, include = sparse(models.Team, schemas.Team, fieldset)
+
+    def build():
+        teams = crud.get_teams(db, skip = skip,
+                               limit = limit,
+                               min_last_changed_date = min_last_changed_date,
+                               team_name = team_name,
+                               league_id = league_id,
+                               after_id = after_id,
+                               fields = fields,
+                               include = include)
+        return (serialize(list[response_model], teams),
+                next_cursor_headers(teams, limit, "team_id"))
+
+    key = ("teams", skip, limit, min_last_changed_date, team_name, league_id, after_id, fieldset)
+    return cached_response(request, db, key, (models.Team, models.TeamPlayer, models.Player), build)
+
+@app.get("/v0/teams/batch/", response_model = schemas.Batch[schemas.Team],
+         tags = ["membership"])
+@db_route
+def read_teams_batch(request: Request, ids: list = Depends(get_ids),
+                     fieldset: tuple = Depends(get_fieldset), db:Session = Depends(get_db)):
+    return read_batch(request, db, models.Team, schemas.Team, ids, fieldset,
+                      (models.Team, models.TeamPlayer, models.Player))
 
 @app.get("/v0/teams/{team_id}", response_model = schemas.Team,
          tags = ["membership"])
-def read_team(db:Session = Depends(get_db), team_id:int = None):
-    team = crud.get_team(db, team_id = team_id)
+@db_route
+def read_team(request: Request, db:Session = Depends(get_db), team_id:int = None,
+              fieldset: tuple = Depends(get_fieldset)):
+    response_model, fields, include = sparse(models.Team, schemas.Team, fieldset)
 
-    if team is None:
-        raise HTTPException(status_code = 404,
-                            detail = "Team not found")
-    return team
+    def build():
+        team = crud.get_team(db, team_id = team_id, fields = fields, include = include)
+
+        if team is None:
+            raise HTTPException(status_code = 404,
+                                detail = "Team not found")
+        return serialize(response_model, team), {}
+
+    return cached_response(request, db, ("team", team_id, fieldset), (models.Team, models.TeamPlayer, models.Player), build)
 
 @app.get("/v0/counts/", response_model = schemas.Counts,
          tags = ["analytics"])
-def read_counts(db:Session = Depends(get_db)):
-    leagues_count = crud.get_league_count(db)
-    teams_count = crud.get_team_count(db)
-    players_count = crud.get_player_count(db)
-
-    counts = schemas.Counts(
-        league_count = leagues_count,
-        team_count = teams_count,
-        player_count = players_count
-    )
-    return counts
\ No newline at end of file
+@db_route
+def read_counts(request: Request, db:Session = Depends(get_db)):
+    def build():
+        return serialize(schemas.Counts, crud.get_counts(db)), {}
+
+    #the version check reads the change_sequence counters, which the triggers
+    #move on inserts and deletes too, so polling between writes is answered
+    #from the cache without counting any table
+    return cached_response(request, db, ("counts",), tuple(crud.COUNTED_MODELS.values()), build)
+
+#scoring aggregates; player and team totals read the season summary table,
+#which the after_flush listener in database.py keeps current on every write
+#through leaderboards.update_on_flush
+@app.get("/v0/analytics/player_season_totals/", response_model = list[schemas.PlayerSeasonTotal],
+         tags = ["analytics"])
+@db_route
+def read_player_season_totals(request: Request,
+                              db:Session = Depends(get_db),
+                              player_id:int = None, season:int = None,
+                              position:str = None,
+                              skip:int = 0, limit:int = 100):
+    def build():
+        totals = crud.get_player_season_totals(db, player_id = player_id,
+                                               season = season,
+                                               position = position,
+                                               skip = skip, limit = limit)
+        return serialize(list[schemas.PlayerSeasonTotal], totals), {}
+
+    key = ("player_season_totals", player_id, season, position, skip, limit)
+    return cached_response(request, db, key, (models.Performance, models.Player), build)
+
+@app.get("/v0/analytics/top_players/", response_model = list[schemas.PlayerSeasonTotal],
+         tags = ["analytics"])
+@db_route
+def read_top_players(request: Request,
+                     db:Session = Depends(get_db),
+                     season:int = None, position:str = None,
+                     limit:int = 10):
+    def build():
+        totals = crud.get_top_players(db, season = season,
+                                      position = position, limit = limit)
+        return serialize(list[schemas.PlayerSeasonTotal], totals), {}
+
+    key = ("top_players", season, position, limit)
+    return cached_response(request, db, key, (models.Performance, models.Player), build)
+
+@app.get("/v0/analytics/team_season_totals/", response_model = list[schemas.TeamSeasonTotal],
+         tags = ["analytics"])
+@db_route
+def read_team_season_totals(request: Request,
+                            db:Session = Depends(get_db),
+                            season:int = None, league_id:int = None):
+    def build():
+        totals = crud.get_team_season_totals(db, season = season,
+                                             league_id = league_id)
+        return serialize(list[schemas.TeamSeasonTotal], totals), {}
+
+    key = ("team_season_totals", season, league_id)
+    return cached_response(request, db, key, (models.Performance, models.Team, models.TeamPlayer), build)
+
+@app.get("/v0/analytics/weekly_averages/", response_model = list[schemas.WeeklyAverage],
+         tags = ["analytics"])
+@db_route
+def read_weekly_averages(request: Request,
+                         db:Session = Depends(get_db),
+                         season:int = None, position:str = None):
+    def build():
+        averages = crud.get_weekly_averages(db, season = season,
+                                            position = position)
+        return serialize(list[schemas.WeeklyAverage], averages), {}
+
+    key = ("weekly_averages", season, position)
+    return cached_response(request, db, key, (models.Performance, models.Player), build)
+
+#leaderboards, served from tables updated as performances are written
+@app.get("/v0/leaderboards/leagues/{league_id}", response_model = list[schemas.LeagueStanding],
+         tags = ["membership"])
+@db_route
+def read_league_standings(request: Request,
+                          db:Session = Depends(get_db),
+                          league_id:int = None, week_number:str = None):
+    def build():
+        standings = crud.get_league_standings(db, league_id = league_id,
+                                              week_number = week_number)
+        return serialize(list[schemas.LeagueStanding], standings), {}
+
+    key = ("league_standings", league_id, week_number)
+    return cached_response(request, db, key, (models.Performance, models.TeamPlayer, models.Team), build)
+
+@app.get("/v0/leaderboards/positions/{position}", response_model = list[schemas.PositionLeader],
+         tags = ["scoring"])
+@db_route
+def read_position_leaders(request: Request,
+                          db:Session = Depends(get_db),
+                          position:str = None, week_number:str = None,
+                          limit:int = 10):
+    def build():
+        leaders = crud.get_position_leaders(db, position = position,
+                                            week_number = week_number,
+                                            limit = limit)
+        return serialize(list[schemas.PositionLeader], leaders), {}
+
+    key = ("position_leaders", position, week_number, limit)
+    return cached_response(request, db, key, (models.Performance, models.Player), build)
+
+@app.get("/v0/database/settings/", response_model = schemas.DatabaseSettings,
+         tags = ["analytics"])
+@db_route
+def read_database_settings(db:Session = Depends(get_db)):
+    return crud.get_database_settings(db)
+
+@app.get("/v0/cache/stats/", response_model = schemas.CacheStats,
+         tags = ["analytics"])
+def read_cache_stats():
+    return response_cache.stats()
+
+#change feeds: rows ordered by change_seq, resumed from the next_watermark
+#of the previous call
+@app.get("/v0/changes/players/", response_model = schemas.ChangeFeed[schemas.PlayerBase],
+         tags = ["player"])
+@db_route
+def read_player_changes(request: Request, db:Session = Depends(get_db), watermark:str = None,
+                        limit:int = Query(1000, ge = 1, le = MAX_CHANGES_LIMIT)):
+    return read_changes(request, db, models.Player, schemas.ChangeFeed[schemas.PlayerBase],
+                        watermark, limit)
+
+@app.get("/v0/changes/performances/", response_model = schemas.ChangeFeed[schemas.Performance],
+         tags = ["scoring"])
+@db_route
+def read_performance_changes(request: Request, db:Session = Depends(get_db), watermark:str = None,
+                             limit:int = Query(1000, ge = 1, le = MAX_CHANGES_LIMIT)):
+    return read_changes(request, db, models.Performance, schemas.ChangeFeed[schemas.Performance],
+                        watermark, limit)
+
+@app.get("/v0/changes/leagues/", response_model = schemas.ChangeFeed[schemas.LeagueBase],
+         tags = ["membership"])
+@db_route
+def read_league_changes(request: Request, db:Session = Depends(get_db), watermark:str = None,
+                        limit:int = Query(1000, ge = 1, le = MAX_CHANGES_LIMIT)):
+    return read_changes(request, db, models.League, schemas.ChangeFeed[schemas.LeagueBase],
+                        watermark, limit)
+
+@app.get("/v0/changes/teams/", response_model = schemas.ChangeFeed[schemas.TeamBase],
+         tags = ["membership"])
+@db_route
+def read_team_changes(request: Request, db:Session = Depends(get_db), watermark:str = None,
+                      limit:int = Query(1000, ge = 1, le = MAX_CHANGES_LIMIT)):
+    return read_changes(request, db, models.Team, schemas.ChangeFeed[schemas.TeamBase],
+                        watermark, limit)
+
+@app.get("/v0/changes/team_players/", response_model = schemas.ChangeFeed[schemas.TeamPlayer],
+         tags = ["membership"])
+@db_route
+def read_team_player_changes(request: Request, db:Session = Depends(get_db), watermark:str = None,
+                             limit:int = Query(1000, ge = 1, le = MAX_CHANGES_LIMIT)):
+    return read_changes(request, db, models.TeamPlayer, schemas.ChangeFeed[schemas.TeamPlayer],
+                        watermark, limit)
+
+@app.get("/v0/bulk/{file_name}", response_class = FileResponse,
+         tags = ["bulk"], summary = "Download a bulk file",
+         description = "Download a whole table as player_data.csv, player_data.parquet and so on.")
+#not a db_route: writing a parquet export is mostly pyarrow work, so the
+#route stays in the threadpool on a sync session in either mode
+def read_bulk_file(request: Request, file_name: str, db:Session = Depends(get_db)):
+    name, _, extension = file_name.rpartition(".")
+    if name not in BULK_FILE_MODELS or extension not in BULK_FILE_MEDIA_TYPES:
+        raise HTTPException(status_code = 404,
+                            detail = "Bulk file not found")
+
+    if extension == "csv":
+        path = DATA_DIR / file_name
+        stat_result = os.stat(path)
+    else:
+        #an export can be replaced twice between finding and reading it, then look again
+        for attempt in range(2):
+            path = parquet_io.get_cached_export(db, BULK_FILE_MODELS[name], name, BULK_CACHE_DIR)
+            try:
+                stat_result = os.stat(path)
+                break
+            except FileNotFoundError:
+                if attempt:
+                    raise
+    response = FileResponse(path, media_type = BULK_FILE_MEDIA_TYPES[extension],
+                            filename = file_name, stat_result = stat_result)
+    validators = {"ETag": response.headers["etag"],
+                  "Last-Modified": response.headers["last-modified"]}
+    if is_not_modified(request, validators):
+        return Response(status_code = 304, headers = validators)
+    return response
@@ -0,0 +1,81 @@
+#bring existing database files up to date with the models
+#usage: python migrations.py [database_url]
+import sys
+from sqlalchemy import DDL, create_engine, func, inspect, select, update
+from database import Base, engine
+import models
+
+def add_change_seq(bind):
+    """Add the change_seq column and its triggers to tables created before it,
+    numbering existing rows in (last_changed_date, primary key) order"""
+    inspector = inspect(bind)
+    added = []
+    with bind.begin() as connection:
+        for model in models.CHANGE_TRACKED:
+            table = model.__table__
+            if "change_seq" in {column["name"] for column in inspector.get_columns(table.name)}:
+                continue
+            connection.execute(DDL(f"ALTER TABLE {table.name} ADD COLUMN change_seq INTEGER"))
+            counter = models.ChangeSequence.table_name == table.name
+            last = connection.execute(select(models.ChangeSequence.value).where(counter)).scalar_one()
+            key = list(table.primary_key.columns)
+            numbered = select(*key, (last + func.row_number().over(order_by = [table.c.last_changed_date, *key]))
+                              .label("change_seq")).subquery()
+            result = connection.execute(update(table).values(change_seq = numbered.c.change_seq)
+                                        .where(*[column == numbered.c[column.name] for column in key]))
+            connection.execute(update(models.ChangeSequence).where(counter)
+                               .values(value = last + result.rowcount))
+            for statement in models.change_triggers(table, bind.dialect.name):
+                connection.execute(DDL(statement))
+            added.append(table.name)
+    return added
+
+def drop_change_triggers(table, dialect_name):
+    """DDL statements dropping the triggers models.change_triggers creates"""
+    if dialect_name == "postgresql":
+        return [f"DROP TRIGGER IF EXISTS {table.name}_change_seq ON {table.name}"]
+    return [f"DROP TRIGGER IF EXISTS {table.name}_change_seq_{operation}"
+            for operation in ("insert", "update", "delete")]
+
+def split_change_sequence(bind):
+    """Replace the single change_sequence counter of older files with a row per
+    table, each carrying on from the largest change_seq in its table"""
+    if "table_name" in {column["name"] for column in inspect(bind).get_columns("change_sequence")}:
+        return False
+    counters = models.ChangeSequence.__table__
+    with bind.begin() as connection:
+        connection.execute(DDL("DROP TABLE change_sequence"))
+        counters.create(connection)
+        for model in models.CHANGE_TRACKED:
+            connection.execute(update(counters).where(counters.c.table_name == model.__tablename__)
+                               .values(value = select(func.coalesce(func.max(model.change_seq), 0))
+                                       .scalar_subquery()))
+            #recreated, as the old ones bump the dropped counter and never on deletes
+            for statement in (drop_change_triggers(model.__table__, bind.dialect.name) +
+                              models.change_triggers(model.__table__, bind.dialect.name)):
+                connection.execute(DDL(statement))
+    return True
+
+def add_missing_indexes(bind):
+    """Create the indexes declared on the models that the database lacks"""
+    inspector = inspect(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key = lambda index: index.name):
+            if index.name not in existing:
+                index.create(bind = bind)
+                created.append(index.name)
+    return created
+
+def upgrade(bind):
+    """Create missing tables, columns and indexes, leaving existing data untouched"""
+    Base.metadata.create_all(bind = bind)
+    split_change_sequence(bind)
+    add_change_seq(bind)
+    return add_missing_indexes(bind)
+
+if __name__ == "__main__":
+    bind = create_engine(sys.argv[1]) if len(sys.argv) > 1 else engine
+    created = upgrade(bind)
+    print(f"Created {len(created)} indexes: {', '.join(created) or 'none'}")
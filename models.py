@@ -1,5 +1,5 @@
 #define the sqlalchemy models here
-from sqlalchemy import Column, Integer, ForeignKey, String, DATETIME
+from sqlalchemy import Column, DDL, Integer, FetchedValue, ForeignKey, Index, String, DATETIME, event
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -8,10 +8,14 @@ class Player(Base):
     
     player_id = Column(Integer, primary_key=True, nullable=False)
     gsis_id = Column(String, unique=True)
-    first_name = Column(String, nullable=False)
-    last_name = Column(String, nullable=False)
+    first_name = Column(String, nullable=False, index=True)
+    last_name = Column(String, nullable=False, index=True)
     position = Column(String, nullable=False)
-    last_changed_date = Column(DATETIME, nullable=False)
+    last_changed_date = Column(DATETIME, nullable=False, index=True)
+    # bumped by the database on every insert and changing update, see change_triggers
+    change_seq = Column(Integer, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    # sqlite sets it after the insert, so it is loaded on access instead of returned
+    __mapper_args__ = {"eager_defaults": False}
 
     performances = relationship("Performance", back_populates="player")
 
@@ -25,9 +29,11 @@ class Team(Base):
     __tablename__ = "team"
 
     team_id = Column(Integer, primary_key=True, nullable=False)
-    team_name = Column(String, nullable=False)
-    league_id = Column(Integer, ForeignKey("league.league_id"), nullable=False)
-    last_changed_date = Column(DATETIME, nullable=False)
+    team_name = Column(String, nullable=False, index=True)
+    league_id = Column(Integer, ForeignKey("league.league_id"), nullable=False, index=True)
+    last_changed_date = Column(DATETIME, nullable=False, index=True)
+    change_seq = Column(Integer, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    __mapper_args__ = {"eager_defaults": False}
 
     league = relationship("League", back_populates="teams")
     players = relationship("Player", secondary="team_player", back_populates="teams")
@@ -41,8 +47,10 @@ class Performance(Base):
     performance_id = Column(Integer, primary_key=True, nullable=False)
     week_number = Column(String, nullable=False)
     fantasy_points = Column(Integer, nullable=False)
-    player_id = Column(Integer, ForeignKey("player.player_id"), nullable=False)
-    last_changed_date = Column(DATETIME, nullable=False)
+    player_id = Column(Integer, ForeignKey("player.player_id"), nullable=False, index=True)
+    last_changed_date = Column(DATETIME, nullable=False, index=True)
+    change_seq = Column(Integer, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    __mapper_args__ = {"eager_defaults": False}
 
     player = relationship("Player", back_populates="performances")
 
@@ -50,9 +58,11 @@ class League(Base):
     __tablename__ = "league"
 
     league_id = Column(Integer, primary_key=True, nullable=False)
-    league_name = Column(String, nullable=False)
+    league_name = Column(String, nullable=False, index=True)
     scoring_type = Column(String, nullable=False)
-    last_changed_date = Column(DATETIME, nullable=False)
+    last_changed_date = Column(DATETIME, nullable=False, index=True)
+    change_seq = Column(Integer, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    __mapper_args__ = {"eager_defaults": False}
 
     teams = relationship("Team", back_populates="league")
 
@@ -60,9 +70,107 @@ class TeamPlayer(Base):
     __tablename__ = "team_player"
 
     team_id = Column(Integer, ForeignKey("team.team_id"), primary_key=True, nullable=False)
-    player_id = Column(Integer, ForeignKey("player.player_id"), primary_key=True, nullable=False)
-    last_changed_date = Column(DATETIME, nullable=False)
+    # team_id lookups use the primary key, player_id lookups need their own index
+    player_id = Column(Integer, ForeignKey("player.player_id"), primary_key=True, nullable=False, index=True)
+    last_changed_date = Column(DATETIME, nullable=False, index=True)
+    change_seq = Column(Integer, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    __mapper_args__ = {"eager_defaults": False}
 
     # We map back to the 'links' attributes to avoid clashing with 'players' and 'teams'
     team = relationship("Team", back_populates="player_links")
-    player = relationship("Player", back_populates="team_links")
\ No newline at end of file
+    player = relationship("Player", back_populates="team_links")
+
+class PlayerSeasonSummary(Base):
+    __tablename__ = "player_season_summary"
+
+    # maintained by leaderboards.py as performances change
+    player_id = Column(Integer, ForeignKey("player.player_id"), primary_key=True, nullable=False)
+    season = Column(Integer, primary_key=True, nullable=False, index=True)
+    games_played = Column(Integer, nullable=False)
+    total_points = Column(Integer, nullable=False)
+    last_changed_date = Column(DATETIME, nullable=False, index=True)
+
+class TeamWeekScore(Base):
+    __tablename__ = "team_week_score"
+
+    # maintained incrementally by leaderboards.py as performances change
+    team_id = Column(Integer, ForeignKey("team.team_id"), primary_key=True, nullable=False)
+    week_number = Column(String, primary_key=True, nullable=False)
+    league_id = Column(Integer, ForeignKey("league.league_id"), nullable=False, index=True)
+    performance_count = Column(Integer, nullable=False)
+    points = Column(Integer, nullable=False)
+
+class PlayerWeekScore(Base):
+    __tablename__ = "player_week_score"
+
+    # maintained incrementally by leaderboards.py as performances change
+    player_id = Column(Integer, ForeignKey("player.player_id"), primary_key=True, nullable=False)
+    week_number = Column(String, primary_key=True, nullable=False)
+    position = Column(String, nullable=False)
+    performance_count = Column(Integer, nullable=False)
+    points = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_player_week_score_position_week", "position", "week_number"),)
+
+class ChangeSequence(Base):
+    __tablename__ = "change_sequence"
+
+    # one row per tracked table: the last change_seq its triggers handed out,
+    # bumped by deletes too, so it moves whenever the table's data does
+    table_name = Column(String, primary_key=True, nullable=False)
+    value = Column(Integer, nullable=False)
+
+# tables whose rows carry a change_seq, in the order the change feeds list them
+CHANGE_TRACKED = [League, Team, Player, TeamPlayer, Performance]
+
+def _insert_counters(table, connection, **kw):
+    connection.execute(table.insert(), [{"table_name": model.__tablename__, "value": 0}
+                                        for model in CHANGE_TRACKED])
+
+event.listen(ChangeSequence.__table__, "after_create", _insert_counters)
+
+def data_columns(table):
+    """Columns of a table without its change_seq, which only the database writes"""
+    return [column for column in table.columns if column.name != "change_seq"]
+
+def change_triggers(table, dialect_name):
+    """DDL statements of the triggers that give each inserted or changed row of
+    table the next change_seq, and bump it for deleted rows. Writers take the
+    table's counter row in turn, so numbers are handed out, and become visible,
+    in commit order."""
+    name = table.name
+    if dialect_name == "postgresql":
+        return ["""CREATE OR REPLACE FUNCTION next_change_seq() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE change_sequence SET value = value + 1 WHERE table_name = TG_TABLE_NAME;
+        RETURN OLD;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+        RETURN NEW;
+    END IF;
+    UPDATE change_sequence SET value = value + 1 WHERE table_name = TG_TABLE_NAME
+        RETURNING value INTO NEW.change_seq;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql""",
+                f"CREATE TRIGGER {name}_change_seq BEFORE INSERT OR UPDATE OR DELETE ON {name} "
+                f"FOR EACH ROW EXECUTE FUNCTION next_change_seq()"]
+    # sqlite triggers cannot assign NEW, so they update the row after the write
+    counter = f"UPDATE change_sequence SET value = value + 1 WHERE table_name = '{name}'; "
+    row = " AND ".join(f"{column.name} = NEW.{column.name}" for column in table.primary_key)
+    bump = (counter + f"UPDATE {name} SET change_seq = (SELECT value FROM change_sequence "
+                      f"WHERE table_name = '{name}') WHERE {row}; ")
+    columns = data_columns(table)
+    changed = " OR ".join(f"NEW.{column.name} IS NOT OLD.{column.name}" for column in columns)
+    return [f"CREATE TRIGGER {name}_change_seq_insert AFTER INSERT ON {name} BEGIN {bump}END",
+            f"CREATE TRIGGER {name}_change_seq_update AFTER UPDATE OF "
+            f"{', '.join(column.name for column in columns)} ON {name} WHEN {changed} BEGIN {bump}END",
+            f"CREATE TRIGGER {name}_change_seq_delete AFTER DELETE ON {name} BEGIN {counter}END"]
+
+def _create_change_triggers(table, connection, **kw):
+    for statement in change_triggers(table, connection.dialect.name):
+        connection.execute(DDL(statement))
+
+for model in CHANGE_TRACKED:
+    event.listen(model.__table__, "after_create", _create_change_triggers)
\ No newline at end of file
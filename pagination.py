@@ -0,0 +1,19 @@
+#opaque cursor tokens for keyset pagination
+import base64
+import json
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last returned row as an opaque token"""
+    raw = json.dumps(list(values), separators = (",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    """Decode a token produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
@@ -0,0 +1,147 @@
+#write database tables as parquet files and load them back
+#usage: python parquet_io.py export [directory] [database_url]
+#       python parquet_io.py load [directory] [database_url]
+import os
+import sys
+import tempfile
+from datetime import datetime, time
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import DATETIME, Integer, create_engine, select
+from sqlalchemy.orm import Session
+from database import SessionLocal, engine
+import crud
+import importer
+import migrations
+import models
+
+ROW_GROUP_SIZE = 10000
+COMPRESSION = "zstd"
+
+#string columns that only ever hold numbers, stored with their real type
+ARROW_TYPES = {"week_number": pa.int32()}
+
+#same file names as the csv files, in the same load order
+PARQUET_FILES = [(Path(file_name).with_suffix(".parquet").name, model)
+                 for file_name, model in importer.LOAD_ORDER]
+
+def arrow_type(column):
+    """Arrow type of a column; last_changed_date values are whole days, so date32"""
+    if column.name in ARROW_TYPES:
+        return ARROW_TYPES[column.name]
+    if isinstance(column.type, DATETIME):
+        return pa.date32()
+    if isinstance(column.type, Integer):
+        return pa.int32()
+    return pa.string()
+
+def arrow_schema(model) -> pa.Schema:
+    """Arrow schema of a model's table"""
+    return pa.schema([pa.field(column.name, arrow_type(column), nullable = column.nullable)
+                      for column in models.data_columns(model.__table__)])
+
+def write_batches(path, model, batches):
+    """Write lists of row tuples, in column order, to a parquet file, one row group per batch"""
+    schema = arrow_schema(model)
+    with pq.ParquetWriter(path, schema, compression = COMPRESSION) as writer:
+        for rows in batches:
+            #build with the stored types, then cast: '202301' to 202301, datetimes to dates
+            columns = [pa.array([row[index] for row in rows]).cast(field.type)
+                       for index, field in enumerate(schema)]
+            writer.write_table(pa.Table.from_arrays(columns, schema = schema),
+                               row_group_size = ROW_GROUP_SIZE)
+
+def export_table(db: Session, model, path):
+    """Write every row of a model's table to a parquet file"""
+    table = model.__table__
+    statement = (select(*models.data_columns(table)).order_by(*table.primary_key.columns)
+                 .execution_options(yield_per = ROW_GROUP_SIZE))
+    write_batches(path, model, db.execute(statement).partitions())
+
+def export_all(db: Session, directory) -> dict:
+    """Export every table to directory, returning the path written per table"""
+    directory = Path(directory)
+    directory.mkdir(parents = True, exist_ok = True)
+    paths = {}
+    for file_name, model in PARQUET_FILES:
+        export_table(db, model, directory / file_name)
+        paths[model.__tablename__] = directory / file_name
+    return paths
+
+def get_converters(model):
+    """Converter per column back to the values the database stores"""
+    converters = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, DATETIME):
+            converters[column.name] = lambda value: datetime.combine(value, time())
+        elif column.name in ARROW_TYPES:
+            converters[column.name] = str
+    return converters
+
+def read_batches(path, model, batch_size = importer.BATCH_SIZE):
+    """Yield lists of row dicts from a parquet file, batch_size rows at a time"""
+    converters = get_converters(model)
+    for batch in pq.ParquetFile(path).iter_batches(batch_size = batch_size):
+        rows = batch.to_pylist()
+        for row in rows:
+            for name, convert in converters.items():
+                if row[name] is not None:
+                    row[name] = convert(row[name])
+        yield rows
+
+def load_all(bind = engine, directory = importer.DATA_DIR, batch_size = importer.BATCH_SIZE):
+    """Upsert every parquet file in directory, returning rows loaded per table"""
+    directory = Path(directory)
+    sources = ((model.__table__, read_batches(directory / file_name, model, batch_size))
+               for file_name, model in PARQUET_FILES if (directory / file_name).exists())
+    return importer.load_batches(bind, sources)
+
+def _export_version(path: Path, name: str) -> int:
+    """Data version in the name of a cached export, -1 for names of older releases"""
+    version = path.stem.removeprefix(f"{name}-")
+    return int(version) if version.isdigit() else -1
+
+def get_cached_export(db: Session, model, name: str, cache_dir) -> Path:
+    """Path of an up to date parquet export of a table, written on first request"""
+    version, = crud.get_data_version(db, model)
+    cache_dir = Path(cache_dir)
+    path = cache_dir / f"{name}-{version}.parquet"
+    if path.exists():
+        return path
+
+    cache_dir.mkdir(parents = True, exist_ok = True)
+    #write to a unique temp file first so concurrent requests never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir = cache_dir, suffix = ".tmp")
+    os.close(fd)
+    try:
+        export_table(db, model, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    #the previous export stays until the next one is written, for requests
+    #that were handed its path just before this one replaced it
+    exports = {stale_path: _export_version(stale_path, name)
+               for stale_path in cache_dir.glob(f"{name}-*.parquet")}
+    older = sorted((stale_path for stale_path, stale_version in exports.items() if stale_version < version),
+                   key = exports.get)
+    for stale_path in older[:-1]:
+        stale_path.unlink(missing_ok = True)
+    return path
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    directory = sys.argv[2] if len(sys.argv) > 2 else "parquet"
+    bind = create_engine(sys.argv[3]) if len(sys.argv) > 3 else engine
+    if command == "export":
+        with SessionLocal(bind = bind) as db:
+            for table_name, path in export_all(db, directory).items():
+                print(f"{table_name}: {path}")
+    elif command == "load":
+        migrations.upgrade(bind)
+        for table_name, rows in load_all(bind, directory).items():
+            print(f"{table_name}: {rows} rows")
+    else:
+        sys.exit(f"Unknown command {command}, expected export or load")
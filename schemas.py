@@ -1,7 +1,10 @@
-from pydantic import BaseModel,ConfigDict
-from typing import List
+from pydantic import BaseModel,ConfigDict,create_model
+from functools import lru_cache
+from typing import Dict, Generic, List, Optional, TypeVar
 from datetime import date
 
+T = TypeVar("T")
+
 class Performance(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     performance_id: int
@@ -34,15 +37,103 @@ class Team(TeamBase):
     model_config = ConfigDict(from_attributes=True)
     players: List[PlayerBase] = []
 
-class League(BaseModel):
+class LeagueBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     league_id: int
     league_name: str
     scoring_type: str
     last_changed_date: date
+
+class League(LeagueBase):
+    model_config = ConfigDict(from_attributes=True)
     teams: List[TeamBase] = []
 
+class TeamPlayer(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    team_id: int
+    player_id: int
+    last_changed_date: date
+
+class ChangeFeed(BaseModel, Generic[T]):
+    items: List[T] = []
+    next_watermark: Optional[str] = None
+    has_more: bool = False
+
+class Batch(BaseModel, Generic[T]):
+    items: List[T] = []
+    not_found: List[int] = []
+
 class Counts(BaseModel):
     league_count: int
     team_count: int
-    player_count: int
\ No newline at end of file
+    player_count: int
+    performance_count: int
+    team_player_count: int
+
+class PlayerSeasonTotal(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    player_id: int
+    season: int
+    position: str
+    games_played: int
+    total_points: int
+    average_points: float
+
+class TeamSeasonTotal(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    team_id: int
+    team_name: str
+    league_id: int
+    season: int
+    player_count: int
+    total_points: int
+
+class WeeklyAverage(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    week_number: str
+    performance_count: int
+    average_points: float
+
+class LeagueStanding(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    rank: int
+    team_id: int
+    team_name: str
+    points: int
+
+class PositionLeader(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    rank: int
+    player_id: int
+    first_name: str
+    last_name: str
+    position: str
+    points: int
+
+class DatabaseSettings(BaseModel):
+    dialect: str
+    read_only: bool
+    async_db: bool
+    pragmas: Dict[str, str] = {}
+
+class CacheStats(BaseModel):
+    entries: int
+    size_bytes: int
+    max_entries: int
+    max_bytes: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    expirations: int
+    invalidations: int
+
+@lru_cache
+def get_sparse_model(response_model, fields: tuple):
+    """Copy of a response model with only the named fields, for fields/include requests"""
+    return create_model(
+        f"{response_model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (field.annotation, field)
+           for name, field in response_model.model_fields.items() if name in fields})
@@ -1,8 +1,11 @@
 """
 Basic tests for the SWCPY SDK
 """
+import asyncio
+import gzip
+import httpx
 import pytest
-from swcpy import SWCClient, SWCConfig
+from swcpy import AsyncSWCClient, SWCClient, SWCConfig
 from datetime import date
 
 @pytest.fixture
@@ -21,6 +24,8 @@ def test_config_initialization():
     assert config.swc_backoff == True
     assert config.swc_backoff_max_time == 30
     assert config.swc_bulk_file_format == "csv"
+    assert config.swc_timeout == 30.0
+    assert config.swc_http2 == False
 
 def test_config_custom_values():
     """Test config with custom values"""
@@ -40,6 +45,259 @@ def test_client_initialization(client):
     assert client is not None
     assert client.swc_base_url == "http://localhost:8000"
 
+def make_performance(performance_id):
+    """Build a performance payload as returned by the API"""
+    return {
+        "performance_id": performance_id,
+        "player_id": 1001,
+        "week_number": "202301",
+        "fantasy_points": 20.0,
+        "last_changed_date": "2024-03-01",
+    }
+
+def test_list_follows_cursor(client, monkeypatch):
+    """Test that limit=None follows the next cursor through every page"""
+    pages = {
+        None: ([make_performance(1), make_performance(2)], {"X-Next-Cursor": "c1"}),
+        "c1": ([make_performance(3)], {}),
+    }
+    requests = []
+
+    def fake_send_request(method, endpoint, params=None):
+        requests.append(dict(params))
+        body, headers = pages[params.get("cursor")]
+        return httpx.Response(200, json=body, headers=headers)
+
+    monkeypatch.setattr(client, "send_request", fake_send_request)
+    performances = client.list_performances(limit=None)
+    assert [p.performance_id for p in performances] == [1, 2, 3]
+    assert performances.next_cursor is None
+    assert requests[1]["cursor"] == "c1"
+
+    page = client.list_performances(limit=2)
+    assert len(page) == 2
+    assert page.next_cursor == "c1"
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_performances_is_lazy(client, monkeypatch, prefetch):
+    """Test that iterators walk every page and fetch them only as needed"""
+    pages = {
+        None: ([make_performance(1), make_performance(2)], {"X-Next-Cursor": "c1"}),
+        "c1": ([make_performance(3), make_performance(4)], {"X-Next-Cursor": "c2"}),
+        "c2": ([make_performance(5)], {}),
+    }
+    requests = []
+
+    def fake_send_request(method, endpoint, params=None):
+        requests.append(params.get("cursor"))
+        body, headers = pages[params.get("cursor")]
+        return httpx.Response(200, json=body, headers=headers)
+
+    monkeypatch.setattr(client, "send_request", fake_send_request)
+    performances = client.iter_performances(page_size=2, prefetch=prefetch)
+    assert requests == []
+
+    first = next(performances)
+    assert first.performance_id == 1
+    assert len(requests) <= 2
+
+    assert [p.performance_id for p in performances] == [2, 3, 4, 5]
+    assert requests == [None, "c1", "c2"]
+
+def test_sync_persists_watermark(client, monkeypatch, tmp_path):
+    """Test that sync only fetches the rows changed since the stored watermark"""
+    feed = {
+        None: {"items": [make_performance(1), make_performance(2)], "next_watermark": "w1", "has_more": True},
+        "w1": {"items": [make_performance(3)], "next_watermark": "w2", "has_more": False},
+        "w2": {"items": [], "next_watermark": "w2", "has_more": False},
+    }
+    requests = []
+
+    def fake_send_request(method, endpoint, params=None):
+        requests.append(params.get("watermark"))
+        return httpx.Response(200, json=feed[params.get("watermark")])
+
+    monkeypatch.setattr(client, "send_request", fake_send_request)
+    state_file = tmp_path / "sync_state.json"
+
+    changes = client.sync("performances", state_file)
+    assert [p.performance_id for p in changes] == [1, 2, 3]
+    assert requests == [None, "w1"]
+
+    assert client.sync("performances", state_file) == []
+    assert requests[-1] == "w2"
+
+def mock_client(monkeypatch, handler, **config):
+    """Create a client whose HTTP calls are answered by handler"""
+    real_client = httpx.Client
+    monkeypatch.setattr(
+        httpx, "Client",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    return SWCClient(SWCConfig(swc_base_url="http://localhost:8000", backoff=False, **config))
+
+def test_client_reuses_connection_pool(monkeypatch):
+    """Test that calls share one pooled HTTP client that closes with the SDK client"""
+    def handler(request):
+        return httpx.Response(200, json={"message": "API health check successful"})
+
+    with mock_client(monkeypatch, handler, max_connections=5) as client:
+        http_client = client._http_client
+        client.get_health_check()
+        client.get_health_check()
+        assert client._http_client is http_client
+        assert not http_client.is_closed
+    assert http_client.is_closed
+
+def test_client_revalidates_with_etag(monkeypatch):
+    """Test that a repeated call sends If-None-Match and reuses the body on 304"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, json={"league_count": 5, "team_count": 20,
+                                         "player_count": 1018},
+                              headers={"ETag": '"v1"'})
+
+    with mock_client(monkeypatch, handler) as client:
+        first = client.get_counts()
+        second = client.get_counts()
+    assert seen == [None, '"v1"']
+    assert second == first
+
+def test_client_validator_cache_is_bounded_by_bytes(monkeypatch):
+    """Test that revalidation keeps only as many bodies as fit in validator_cache_bytes"""
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers.get("If-None-Match")))
+        league_id = int(request.url.path.split("/")[-1])
+        return httpx.Response(200, json={"league_id": league_id, "league_name": "x" * 300,
+                                         "scoring_type": "PPR", "last_changed_date": "2024-04-18"},
+                              headers={"ETag": f'"{league_id}"'})
+
+    with mock_client(monkeypatch, handler, validator_cache_bytes=1000) as client:
+        for league_id in [5001, 5002, 5003, 5003, 5001]:
+            client.get_league(league_id)
+        assert client._validated_bytes <= 1000
+        assert len(client._validated_responses) == 2
+    # 5001 was evicted for 5003, so it is fetched again without a validator
+    assert seen[3:] == [("/v0/leagues/5003", '"5003"'), ("/v0/leagues/5001", None)]
+
+@pytest.mark.parametrize("compression,accepts_gzip", [(True, True), (False, False)])
+def test_client_negotiates_compression(monkeypatch, compression, accepts_gzip):
+    """Test that compressed responses are requested and decoded, unless turned off"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers["Accept-Encoding"])
+        body = b'{"message": "API health check successful"}'
+        if "gzip" in request.headers["Accept-Encoding"]:
+            return httpx.Response(200, content=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+        return httpx.Response(200, content=body)
+
+    client = mock_client(monkeypatch, handler, compression=compression)
+    assert client.get_health_check() == {"message": "API health check successful"}
+    assert ("gzip" in seen[0]) == accepts_gzip
+
+def test_get_bulk_player_file(monkeypatch, tmp_path):
+    """Test that bulk files are streamed to the destination directory"""
+    content = b"player_id,gsis_id\n" + b"1001,00-0023459\n" * 20000
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        return httpx.Response(200, content=content)
+
+    client = mock_client(monkeypatch, handler)
+    path = client.get_bulk_player_file(tmp_path)
+    assert requested == ["/v0/bulk/player_data.csv"]
+    assert path == tmp_path / "player_data.csv"
+    assert path.read_bytes() == content
+    assert list(tmp_path.iterdir()) == [path]
+
+def test_stream_performances(monkeypatch):
+    """Test that streamed performances are requested as NDJSON and parsed per line"""
+    lines = [
+        f'{{"performance_id": {index}, "week_number": "202301", "fantasy_points": 10.5, '
+        f'"player_id": 1001, "last_changed_date": "2024-04-18"}}'
+        for index in range(3)
+    ]
+
+    def handler(request):
+        assert request.headers["Accept"] == "application/x-ndjson"
+        assert request.url.params["stream"] == "true"
+        assert request.url.params["limit"] == "3"
+        return httpx.Response(200, content="\n".join(lines) + "\n")
+
+    client = mock_client(monkeypatch, handler)
+    performances = list(client.stream_performances(limit=3))
+    assert [performance.performance_id for performance in performances] == [0, 1, 2]
+    assert performances[0].fantasy_points == 10.5
+
+def player_batch_handler(request):
+    """Answer a player batch request, reporting IDs above 2000 as not found"""
+    assert request.url.path == "/v0/players/batch/"
+    ids = [int(value) for value in request.url.params["ids"].split(",")]
+    return httpx.Response(200, json={
+        "items": [{
+            "player_id": player_id,
+            "gsis_id": f"00-{player_id}",
+            "first_name": "First",
+            "last_name": "Last",
+            "position": "QB",
+            "last_changed_date": "2024-04-18",
+        } for player_id in ids if player_id <= 2000],
+        "not_found": [player_id for player_id in ids if player_id > 2000],
+    })
+
+def test_get_players_chunks_ids(monkeypatch):
+    """Test that batch lookups are split into BATCH_SIZE chunks and keep order"""
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.params["ids"])
+        return player_batch_handler(request)
+
+    client = mock_client(monkeypatch, handler)
+    client.BATCH_SIZE = 2
+    players = client.get_players([1003, 1001, 2001, 1001, 1002])
+    assert requested == ["1003,1001", "2001,1002"]
+    assert [p.player_id for p in players] == [1003, 1001, 1002]
+    assert players.not_found == [2001]
+
+def test_async_get_players_bounds_concurrency(monkeypatch):
+    """Test that bulk async fetches keep order and stay under max_concurrency"""
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return player_batch_handler(request)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        httpx, "AsyncClient",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+
+    async def fetch():
+        config = SWCConfig(swc_base_url="http://localhost:8000", backoff=False, max_concurrency=4)
+        async with AsyncSWCClient(config) as client:
+            client.BATCH_SIZE = 5
+            return await client.get_players(list(range(1001, 1041)))
+
+    players = asyncio.run(fetch())
+    assert [p.player_id for p in players] == list(range(1001, 1041))
+    assert players.not_found == []
+    assert peak == 4
+
 # Integration tests (require running API)
 @pytest.mark.integration
 def test_health_check(client):
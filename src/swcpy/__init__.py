@@ -1,4 +1,5 @@
-from .swc_client import SWCClient
+from .swc_client import SWCClient, Batch, Page
+from .swc_async_client import AsyncSWCClient
 from .swc_config import SWCConfig
 from .schemas.schemas import (
     Player,
@@ -6,18 +7,25 @@ from .schemas.schemas import (
     Performance,
     Team,
     TeamBase,
+    TeamPlayer,
     League,
+    LeagueBase,
     Counts
 )
 
 __all__ = [
     "SWCClient",
+    "AsyncSWCClient",
     "SWCConfig",
+    "Page",
+    "Batch",
     "Player",
     "PlayerBase",
     "Performance",
     "Team",
     "TeamBase",
+    "TeamPlayer",
     "League",
+    "LeagueBase",
     "Counts",
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel,ConfigDict
-from typing import List
+from typing import List, Optional
 from datetime import date
 
 class Performance(BaseModel):
@@ -34,15 +34,27 @@ class Team(TeamBase):
     model_config = ConfigDict(from_attributes=True)
     players: List[PlayerBase] = []
 
-class League(BaseModel):
+class LeagueBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     league_id: int
     league_name: str
     scoring_type: str
     last_changed_date: date
+
+class League(LeagueBase):
+    model_config = ConfigDict(from_attributes=True)
     teams: List[TeamBase] = []
 
+class TeamPlayer(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    team_id: int
+    player_id: int
+    last_changed_date: date
+
 class Counts(BaseModel):
     league_count: int
     team_count: int
-    player_count: int
\ No newline at end of file
+    player_count: int
+    # not reported by API versions before the combined counts query
+    performance_count: Optional[int] = None
+    team_player_count: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,296 @@
+import asyncio
+import httpx
+import swcpy.swc_config as config
+from .schemas.schemas import League, Team, Player, Performance, Counts
+from .swc_client import BaseSWCClient, Batch, Page
+from typing import AsyncIterator, List, Optional
+from datetime import date
+from pathlib import Path
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class AsyncSWCClient(BaseSWCClient):
+    """Asyncio version of SWCClient with a bounded number of requests in flight."""
+
+    def __init__(self, input_config: config.SWCConfig):
+        super().__init__(input_config)
+        self._http_client = httpx.AsyncClient(**self._http_client_options(input_config))
+        # every request waits here, so bulk fetches never exceed max_concurrency
+        self._semaphore = asyncio.Semaphore(input_config.swc_max_concurrency)
+        self.send_request = self._with_backoff(self._send_request)
+        self.download_file = self._with_backoff(self._download_file)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        await self._http_client.aclose()
+
+    async def _send_request(self, method: str, endpoint: str, params: dict = None) -> httpx.Response:
+        """Internal method to make API calls."""
+        cache_key = self._cache_key(method, endpoint, params)
+        async with self._semaphore:
+            response = await self._http_client.request(
+                method, endpoint, params=params, headers=self._validator_headers(cache_key)
+            )
+        response = self._resolve_validated(cache_key, response)
+        response.raise_for_status()
+        return response
+
+    async def _download_file(self, endpoint: str, destination: Path) -> Path:
+        """Internal method to stream a file to disk chunk by chunk."""
+        temp_path = destination.with_name(destination.name + ".part")
+        async with self._semaphore:
+            async with self._http_client.stream("GET", endpoint) as response:
+                response.raise_for_status()
+                with open(temp_path, "wb") as file:
+                    async for chunk in response.aiter_bytes(self.BULK_FILE_CHUNK_SIZE):
+                        file.write(chunk)
+        os.replace(temp_path, destination)
+        return destination
+
+    async def call_api(self, method: str, endpoint: str, params: dict = None):
+        """Make an API call and return the decoded JSON body."""
+        response = await self.send_request(method, endpoint, params=params)
+        return response.json()
+
+    async def _get_page(self, endpoint: str, params: dict, model) -> Page:
+        """Fetch one page of a list endpoint."""
+        response = await self.send_request("GET", endpoint, params=params)
+        return Page(
+            [model(**item) for item in response.json()],
+            response.headers.get(self.NEXT_CURSOR_HEADER),
+        )
+
+    async def _paginate(self, endpoint: str, params: dict, model):
+        """Yield pages of a list endpoint, following the next cursor until exhausted."""
+        params = dict(params)
+        while True:
+            page = await self._get_page(endpoint, params, model)
+            yield page
+            if page.next_cursor is None:
+                break
+            params["cursor"] = page.next_cursor
+            params.pop("skip", None)
+
+    async def _list(self, endpoint: str, params: dict, model, limit: Optional[int]) -> Page:
+        """Fetch one page, or every page when limit is None."""
+        if limit is not None:
+            return await self._get_page(endpoint, {**params, "limit": limit}, model)
+        items = Page()
+        async for page in self._paginate(endpoint, {**params, "limit": self.PAGE_SIZE}, model):
+            items.extend(page)
+        return items
+
+    async def _get_batch(self, endpoint: str, ids: List[int], model) -> Batch:
+        """Fetch items by ID through a batch endpoint, requesting the chunks concurrently."""
+        results = await asyncio.gather(*(
+            self.call_api("GET", endpoint + self.BATCH_ENDPOINT, params=params)
+            for params in self._batch_chunks(ids)
+        ))
+        return self._merge_batches(results, model)
+
+    async def _stream(self, endpoint: str, params: dict, model) -> AsyncIterator:
+        """Yield the items of a streamed NDJSON list response as its lines arrive."""
+        async with self._semaphore:
+            async with self._http_client.stream(
+                "GET", endpoint, params={**params, "stream": True},
+                headers={"Accept": self.NDJSON_MEDIA_TYPE},
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield model(**json.loads(line))
+
+    async def get_health_check(self) -> dict:
+        """Check the health of the API."""
+        return await self.call_api("GET", self.HEALTH_CHECK_ENDPOINT)
+
+    async def get_counts(self) -> Counts:
+        """Get counts of leagues, teams, and players."""
+        data = await self.call_api("GET", self.GET_COUNTS_ENDPOINT)
+        return Counts(**data)
+
+    async def list_players(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        min_last_changed_date: Optional[date] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[Player]:
+        """List players with optional filters."""
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        return await self._list(self.LIST_PLAYERS_ENDPOINT, params, Player, limit)
+
+    async def get_player(self, player_id: int) -> Player:
+        """Get a specific player by ID."""
+        data = await self.call_api("GET", f"/v0/players/{player_id}")
+        return Player(**data)
+
+    async def get_players(self, player_ids: List[int]) -> Batch:
+        """Get several players by ID, BATCH_SIZE IDs per concurrent request."""
+        return await self._get_batch(self.LIST_PLAYERS_ENDPOINT, player_ids, Player)
+
+    def stream_players(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        min_last_changed_date: Optional[date] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> AsyncIterator[Player]:
+        """Stream up to limit players in one response, parsed line by line."""
+        params = self._list_params(
+            skip, None,
+            min_last_changed_date=min_last_changed_date,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        return self._stream(self.LIST_PLAYERS_ENDPOINT, {**params, "limit": limit}, Player)
+
+    async def list_performances(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        min_last_changed_date: Optional[date] = None,
+        cursor: Optional[str] = None
+    ) -> List[Performance]:
+        """List performances with optional filters."""
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+        )
+        return await self._list(self.LIST_PERFORMANCES_ENDPOINT, params, Performance, limit)
+
+    async def get_performance(self, performance_id: int) -> Performance:
+        """Get a specific performance by ID."""
+        data = await self.call_api("GET", f"/v0/performances/{performance_id}")
+        return Performance(**data)
+
+    async def get_performances(self, performance_ids: List[int]) -> Batch:
+        """Get several performances by ID, BATCH_SIZE IDs per concurrent request."""
+        return await self._get_batch(self.LIST_PERFORMANCES_ENDPOINT, performance_ids, Performance)
+
+    def stream_performances(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        min_last_changed_date: Optional[date] = None
+    ) -> AsyncIterator[Performance]:
+        """Stream up to limit performances in one response, parsed line by line."""
+        params = self._list_params(
+            skip, None,
+            min_last_changed_date=min_last_changed_date,
+        )
+        return self._stream(self.LIST_PERFORMANCES_ENDPOINT, {**params, "limit": limit}, Performance)
+
+    async def list_leagues(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        min_last_changed_date: Optional[date] = None,
+        league_name: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[League]:
+        """List leagues with optional filters."""
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+            league_name=league_name,
+        )
+        return await self._list(self.LIST_LEAGUES_ENDPOINT, params, League, limit)
+
+    async def get_league(self, league_id: int) -> League:
+        """Get a specific league by ID."""
+        data = await self.call_api("GET", f"/v0/leagues/{league_id}")
+        return League(**data)
+
+    async def get_leagues(self, league_ids: List[int]) -> Batch:
+        """Get several leagues by ID, BATCH_SIZE IDs per concurrent request."""
+        return await self._get_batch(self.LIST_LEAGUES_ENDPOINT, league_ids, League)
+
+    async def list_teams(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        min_last_changed_date: Optional[date] = None,
+        team_name: Optional[str] = None,
+        league_id: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> List[Team]:
+        """List teams with optional filters."""
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+            team_name=team_name,
+            league_id=league_id,
+        )
+        return await self._list(self.LIST_TEAMS_ENDPOINT, params, Team, limit)
+
+    async def get_team(self, team_id: int) -> Team:
+        """Get a specific team by ID."""
+        data = await self.call_api("GET", f"/v0/teams/{team_id}")
+        return Team(**data)
+
+    async def get_teams(self, team_ids: List[int]) -> Batch:
+        """Get several teams by ID, BATCH_SIZE IDs per concurrent request."""
+        return await self._get_batch(self.LIST_TEAMS_ENDPOINT, team_ids, Team)
+
+    async def get_bulk_file(self, file_key: str, destination: Optional[str] = None) -> Path:
+        """Download a bulk file in the configured format."""
+        path = self._bulk_file_path(file_key, destination)
+        return await self.download_file(self.BULK_FILE_BASE_URL + self.BULK_FILE_NAMES[file_key], path)
+
+    async def get_bulk_player_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk player file."""
+        return await self.get_bulk_file("players", destination)
+
+    async def get_bulk_league_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk league file."""
+        return await self.get_bulk_file("leagues", destination)
+
+    async def get_bulk_performance_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk performance file."""
+        return await self.get_bulk_file("performances", destination)
+
+    async def get_bulk_team_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk team file."""
+        return await self.get_bulk_file("teams", destination)
+
+    async def get_bulk_team_player_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk team player file."""
+        return await self.get_bulk_file("team_players", destination)
+
+    async def sync(self, entity: str, state_file: str, limit: int = 1000) -> list:
+        """Fetch the rows of an entity changed since the last sync."""
+        endpoint, model = self.CHANGES_ENDPOINTS[entity]
+        watermark = self._read_watermark(state_file, entity)
+
+        changes = []
+        while True:
+            params = {"limit": limit}
+            if watermark:
+                params["watermark"] = watermark
+            data = await self.call_api("GET", endpoint, params=params)
+            changes.extend(model(**item) for item in data["items"])
+            watermark = data["next_watermark"]
+            if not data["has_more"]:
+                break
+
+        self._write_watermark(state_file, entity, watermark)
+        logger.debug(f"Synced {len(changes)} {entity} up to watermark {watermark}")
+        return changes
@@ -1,14 +1,39 @@
 import httpx
 import swcpy.swc_config as config
-from .schemas.schemas import League, Team, Player, Performance, Counts
-from typing import List, Optional
+from .schemas.schemas import (
+    League, LeagueBase, Team, TeamBase, TeamPlayer, Player, PlayerBase,
+    Performance, Counts
+)
+from typing import Iterator, List, Optional
+from collections import OrderedDict
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 import backoff
+import json
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
-class SWCClient:
+class Page(list):
+    """One page of list results and the cursor of the page after it."""
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+class Batch(list):
+    """Items found by a batch lookup, in the order asked, and the IDs that were not."""
+
+    def __init__(self, items=(), not_found=()):
+        super().__init__(items)
+        self.not_found = list(not_found)
+
+class BaseSWCClient:
+    """Endpoints and configuration shared by the sync and async clients."""
+
     HEALTH_CHECK_ENDPOINT = "/" 
     LIST_LEAGUES_ENDPOINT = "/v0/leagues/"
     LIST_PLAYERS_ENDPOINT = "/v0/players/"
@@ -16,7 +41,23 @@ class SWCClient:
     LIST_TEAMS_ENDPOINT = "/v0/teams/"
     GET_COUNTS_ENDPOINT = "/v0/counts/"
 
-    BULK_FILE_BASE_URL = ""
+    CHANGES_ENDPOINTS = {
+        "players": ("/v0/changes/players/", PlayerBase),
+        "performances": ("/v0/changes/performances/", Performance),
+        "leagues": ("/v0/changes/leagues/", LeagueBase),
+        "teams": ("/v0/changes/teams/", TeamBase),
+        "team_players": ("/v0/changes/team_players/", TeamPlayer),
+    }
+
+    NEXT_CURSOR_HEADER = "X-Next-Cursor"
+    NDJSON_MEDIA_TYPE = "application/x-ndjson"
+    PAGE_SIZE = 1000
+    # IDs per batch lookup request; the API accepts up to 1000
+    BATCH_SIZE = 500
+    BATCH_ENDPOINT = "batch/"
+
+    BULK_FILE_BASE_URL = "/v0/bulk/"
+    BULK_FILE_CHUNK_SIZE = 64 * 1024
 
     def __init__(self, input_config: config.SWCConfig):
         logger.debug(f"Bulk file base URL: {self.BULK_FILE_BASE_URL}")
@@ -26,6 +67,12 @@ class SWCClient:
         self.backoff_enabled = input_config.swc_backoff
         self.backoff_max_time = input_config.swc_backoff_max_time
         self.bulk_file_format = input_config.swc_bulk_file_format
+        self.validator_cache_size = input_config.swc_validator_cache_size
+        self.validator_cache_bytes = input_config.swc_validator_cache_bytes
+        # GET responses that carried an ETag, most recently used last
+        self._validated_responses = OrderedDict()
+        self._validated_bytes = 0
+        self._validated_responses_lock = threading.Lock()
         self.BULK_FILE_NAMES = { 
             "players": "player_data",
             "leagues": "league_data",
@@ -34,16 +81,6 @@ class SWCClient:
             "team_players": "team_player_data",
         }
 
-        if self.backoff_enabled: 
-            self.call_api = backoff.on_exception(
-                wait_gen=backoff.expo,
-                exception=(httpx.RequestError, httpx.HTTPStatusError),
-                max_time=self.backoff_max_time,
-                jitter=backoff.random_jitter,
-            )(self._call_api)
-        else:
-            self.call_api = self._call_api
-
         if self.bulk_file_format.lower() == "parquet":
             self.BULK_FILE_NAMES = {
                 key: value + ".parquet" for key, value in
@@ -56,12 +93,239 @@ class SWCClient:
             }
         logger.debug(f"Bulk file dictionary: {self.BULK_FILE_NAMES}")
 
-    def _call_api(self, method: str, endpoint: str, params: dict = None):
+    def _with_backoff(self, function):
+        """Wrap a call in exponential backoff when it is enabled."""
+        if not self.backoff_enabled:
+            return function
+        return backoff.on_exception(
+            wait_gen=backoff.expo,
+            exception=(httpx.RequestError, httpx.HTTPStatusError),
+            max_time=self.backoff_max_time,
+            jitter=backoff.random_jitter,
+        )(function)
+
+    @staticmethod
+    def _http_client_options(input_config: config.SWCConfig) -> dict:
+        """Keyword arguments for the pooled httpx client.
+
+        httpx advertises and decodes every coding it has a decoder for, so
+        compression only needs switching off.
+        """
+        headers = {} if input_config.swc_compression else {"Accept-Encoding": "identity"}
+        return dict(
+            headers=headers,
+            base_url=input_config.swc_base_url,
+            timeout=input_config.swc_timeout,
+            limits=httpx.Limits(
+                max_connections=input_config.swc_max_connections,
+                max_keepalive_connections=input_config.swc_max_keepalive_connections,
+                keepalive_expiry=input_config.swc_keepalive_expiry,
+            ),
+            http2=input_config.swc_http2,
+        )
+
+    def _cache_key(self, method: str, endpoint: str, params: Optional[dict]):
+        """Key of a revalidatable request, or None when it is not one."""
+        if method.upper() != "GET" or not self.validator_cache_size:
+            return None
+        return endpoint, tuple(sorted((params or {}).items()))
+
+    def _validator_headers(self, cache_key) -> dict:
+        """If-None-Match header for a request whose response is cached."""
+        if cache_key is None:
+            return {}
+        with self._validated_responses_lock:
+            cached = self._validated_responses.get(cache_key)
+        return {"If-None-Match": cached.headers["ETag"]} if cached else {}
+
+    def _resolve_validated(self, cache_key, response: httpx.Response) -> httpx.Response:
+        """Swap a 304 for the cached response and remember new validated ones."""
+        if cache_key is None:
+            return response
+        with self._validated_responses_lock:
+            if response.status_code == 304 and cache_key in self._validated_responses:
+                self._validated_responses.move_to_end(cache_key)
+                return self._validated_responses[cache_key]
+            if response.status_code != 200:
+                return response
+            replaced = self._validated_responses.pop(cache_key, None)
+            if replaced is not None:
+                self._validated_bytes -= len(replaced.content)
+            size = len(response.content)
+            if "ETag" in response.headers and size <= self.validator_cache_bytes:
+                self._validated_responses[cache_key] = response
+                self._validated_bytes += size
+                while (len(self._validated_responses) > self.validator_cache_size
+                       or self._validated_bytes > self.validator_cache_bytes):
+                    _, evicted = self._validated_responses.popitem(last=False)
+                    self._validated_bytes -= len(evicted.content)
+        return response
+
+    @staticmethod
+    def _list_params(skip: int, cursor: Optional[str], **filters) -> dict:
+        """Query parameters of a list call, leaving out unset filters."""
+        params = {"skip": skip}
+        if cursor:
+            params["cursor"] = cursor
+        for name, value in filters.items():
+            if value:
+                params[name] = value.isoformat() if isinstance(value, date) else value
+        return params
+
+    def _batch_chunks(self, ids: List[int]) -> List[dict]:
+        """Query parameters of each batch request, BATCH_SIZE unique IDs apiece."""
+        ids = list(dict.fromkeys(ids))
+        return [
+            {"ids": ",".join(str(item_id) for item_id in ids[start:start + self.BATCH_SIZE])}
+            for start in range(0, len(ids), self.BATCH_SIZE)
+        ]
+
+    @staticmethod
+    def _merge_batches(results: List[dict], model) -> Batch:
+        """Combine the responses of batch requests, keeping their order."""
+        batch = Batch()
+        for data in results:
+            batch.extend(model(**item) for item in data["items"])
+            batch.not_found.extend(data["not_found"])
+        return batch
+
+    def _bulk_file_path(self, file_key: str, destination: Optional[str]) -> Path:
+        """Local path a bulk file is downloaded to."""
+        file_name = self.BULK_FILE_NAMES[file_key]
+        path = Path(destination) if destination else Path(file_name)
+        if path.is_dir():
+            path = path / file_name
+        return path
+
+    @staticmethod
+    def _read_watermark(state_file: str, entity: str) -> Optional[str]:
+        """Watermark of the last sync of an entity, if any."""
+        state_path = Path(state_file)
+        state = json.loads(state_path.read_text()) if state_path.exists() else {}
+        return state.get(entity)
+
+    @staticmethod
+    def _write_watermark(state_file: str, entity: str, watermark: Optional[str]):
+        """Store the watermark of an entity, replacing the state file atomically."""
+        state_path = Path(state_file)
+        state = json.loads(state_path.read_text()) if state_path.exists() else {}
+        if watermark == state.get(entity):
+            return
+        state[entity] = watermark
+        temp_path = state_path.with_name(state_path.name + ".tmp")
+        temp_path.write_text(json.dumps(state, indent=2))
+        os.replace(temp_path, state_path)
+
+class SWCClient(BaseSWCClient):
+    def __init__(self, input_config: config.SWCConfig):
+        super().__init__(input_config)
+        # one pooled client for the lifetime of the SDK client, so calls
+        # reuse open connections instead of reconnecting every time
+        self._http_client = httpx.Client(**self._http_client_options(input_config))
+        self.send_request = self._with_backoff(self._send_request)
+        self.download_file = self._with_backoff(self._download_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the pooled connections."""
+        self._http_client.close()
+
+    def _send_request(self, method: str, endpoint: str, params: dict = None) -> httpx.Response:
         """Internal method to make API calls."""
-        with httpx.Client(base_url=self.swc_base_url, timeout=30.0) as client:
-            response = client.request(method, endpoint, params=params)
+        cache_key = self._cache_key(method, endpoint, params)
+        response = self._http_client.request(
+            method, endpoint, params=params, headers=self._validator_headers(cache_key)
+        )
+        response = self._resolve_validated(cache_key, response)
+        response.raise_for_status()
+        return response
+
+    def _download_file(self, endpoint: str, destination: Path) -> Path:
+        """Internal method to stream a file to disk chunk by chunk."""
+        temp_path = destination.with_name(destination.name + ".part")
+        with self._http_client.stream("GET", endpoint) as response:
+            response.raise_for_status()
+            with open(temp_path, "wb") as file:
+                for chunk in response.iter_bytes(self.BULK_FILE_CHUNK_SIZE):
+                    file.write(chunk)
+        os.replace(temp_path, destination)
+        return destination
+
+    def call_api(self, method: str, endpoint: str, params: dict = None):
+        """Make an API call and return the decoded JSON body."""
+        return self.send_request(method, endpoint, params=params).json()
+
+    def _get_page(self, endpoint: str, params: dict, model) -> Page:
+        """Fetch one page of a list endpoint."""
+        response = self.send_request("GET", endpoint, params=params)
+        return Page(
+            [model(**item) for item in response.json()],
+            response.headers.get(self.NEXT_CURSOR_HEADER),
+        )
+
+    def _paginate(self, endpoint: str, params: dict, model):
+        """Yield pages of a list endpoint, following the next cursor until exhausted."""
+        params = dict(params)
+        while True:
+            page = self._get_page(endpoint, params, model)
+            yield page
+            if page.next_cursor is None:
+                break
+            params["cursor"] = page.next_cursor
+            params.pop("skip", None)
+
+    def _list(self, endpoint: str, params: dict, model, limit: Optional[int]) -> Page:
+        """Fetch one page, or every page when limit is None."""
+        if limit is not None:
+            return self._get_page(endpoint, {**params, "limit": limit}, model)
+        items = Page()
+        for page in self._paginate(endpoint, {**params, "limit": self.PAGE_SIZE}, model):
+            items.extend(page)
+        return items
+
+    @staticmethod
+    def _prefetch(pages: Iterator[Page]) -> Iterator[Page]:
+        """Yield pages while the page after the current one is fetched in the background."""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(next, pages, None)
+            while True:
+                page = future.result()
+                if page is None:
+                    break
+                future = executor.submit(next, pages, None)
+                yield page
+
+    def _iter(self, endpoint: str, params: dict, model, page_size: int, prefetch: bool):
+        """Yield the items of every page one at a time."""
+        pages = self._paginate(endpoint, {**params, "limit": page_size or self.PAGE_SIZE}, model)
+        if prefetch:
+            pages = self._prefetch(pages)
+        for page in pages:
+            yield from page
+
+    def _get_batch(self, endpoint: str, ids: List[int], model) -> Batch:
+        """Fetch items by ID through a batch endpoint, one request per chunk of IDs."""
+        return self._merge_batches(
+            [self.call_api("GET", endpoint + self.BATCH_ENDPOINT, params=params)
+             for params in self._batch_chunks(ids)],
+            model,
+        )
+
+    def _stream(self, endpoint: str, params: dict, model) -> Iterator:
+        """Yield the items of a streamed NDJSON list response as its lines arrive."""
+        with self._http_client.stream(
+            "GET", endpoint, params={**params, "stream": True},
+            headers={"Accept": self.NDJSON_MEDIA_TYPE},
+        ) as response:
             response.raise_for_status()
-            return response.json()
+            for line in response.iter_lines():
+                if line:
+                    yield model(**json.loads(line))
 
     def get_health_check(self) -> dict:
         """Check the health of the API."""
@@ -75,94 +339,266 @@ class SWCClient:
     def list_players(
         self, 
         skip: int = 0, 
-        limit: int = 100,
+        limit: Optional[int] = 100,
         min_last_changed_date: Optional[date] = None,
         first_name: Optional[str] = None,
-        last_name: Optional[str] = None
+        last_name: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Player]:
-        """List players with optional filters."""
-        params = {"skip": skip, "limit": limit}
-        if min_last_changed_date:
-            params["min_last_changed_date"] = min_last_changed_date.isoformat()
-        if first_name:
-            params["first_name"] = first_name
-        if last_name:
-            params["last_name"] = last_name
-        
-        data = self.call_api("GET", self.LIST_PLAYERS_ENDPOINT, params=params)
-        return [Player(**player) for player in data]
+        """List players with optional filters.
+
+        Pass the next_cursor of a returned page as cursor to fetch the page
+        after it, or limit=None to follow the cursors through every page.
+        """
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        return self._list(self.LIST_PLAYERS_ENDPOINT, params, Player, limit)
     
     def get_player(self, player_id: int) -> Player:
         """Get a specific player by ID."""
         endpoint = f"/v0/players/{player_id}"
         data = self.call_api("GET", endpoint)
         return Player(**data)
+
+    def get_players(self, player_ids: List[int]) -> Batch:
+        """Get several players by ID with one request per BATCH_SIZE IDs.
+
+        Players are returned in the order of player_ids; IDs without a
+        player are listed in the not_found attribute of the result.
+        """
+        return self._get_batch(self.LIST_PLAYERS_ENDPOINT, player_ids, Player)
     
-    def list_performances(
+    def iter_players(
+        self,
+        min_last_changed_date: Optional[date] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        page_size: Optional[int] = None,
+        prefetch: bool = True
+    ) -> Iterator[Player]:
+        """Iterate over every matching player, fetching pages lazily.
+
+        With prefetch the next page is requested in the background while the
+        current one is consumed, so at most two pages are held in memory.
+        """
+        params = self._list_params(
+            0, None,
+            min_last_changed_date=min_last_changed_date,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        return self._iter(self.LIST_PLAYERS_ENDPOINT, params, Player, page_size, prefetch)
+
+    def stream_players(
         self,
         skip: int = 0,
         limit: int = 100,
-        min_last_changed_date: Optional[date] = None
+        min_last_changed_date: Optional[date] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> Iterator[Player]:
+        """Stream up to limit players in one response, parsed line by line.
+
+        The server writes rows as its query yields them, so memory on both
+        sides stays flat however large limit is. The stream is not retried.
+        """
+        params = self._list_params(
+            skip, None,
+            min_last_changed_date=min_last_changed_date,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        return self._stream(self.LIST_PLAYERS_ENDPOINT, {**params, "limit": limit}, Player)
+
+    def list_performances(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        min_last_changed_date: Optional[date] = None,
+        cursor: Optional[str] = None
     ) -> List[Performance]:
         """List performances with optional filters."""
-        params = {"skip": skip, "limit": limit}
-        if min_last_changed_date:
-            params["min_last_changed_date"] = min_last_changed_date.isoformat()
-        
-        data = self.call_api("GET", self.LIST_PERFORMANCES_ENDPOINT, params=params)
-        return [Performance(**perf) for perf in data]
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+        )
+        return self._list(self.LIST_PERFORMANCES_ENDPOINT, params, Performance, limit)
     
     def get_performance(self, performance_id: int) -> Performance:
         """Get a specific performance by ID."""
         endpoint = f"/v0/performances/{performance_id}"
         data = self.call_api("GET", endpoint)
         return Performance(**data)
+
+    def get_performances(self, performance_ids: List[int]) -> Batch:
+        """Get several performances by ID with one request per BATCH_SIZE IDs."""
+        return self._get_batch(self.LIST_PERFORMANCES_ENDPOINT, performance_ids, Performance)
     
-    def list_leagues(
+    def iter_performances(
+        self,
+        min_last_changed_date: Optional[date] = None,
+        page_size: Optional[int] = None,
+        prefetch: bool = True
+    ) -> Iterator[Performance]:
+        """Iterate over every matching performance, fetching pages lazily."""
+        params = self._list_params(
+            0, None,
+            min_last_changed_date=min_last_changed_date,
+        )
+        return self._iter(self.LIST_PERFORMANCES_ENDPOINT, params, Performance, page_size, prefetch)
+
+    def stream_performances(
         self,
         skip: int = 0,
         limit: int = 100,
+        min_last_changed_date: Optional[date] = None
+    ) -> Iterator[Performance]:
+        """Stream up to limit performances in one response, parsed line by line."""
+        params = self._list_params(
+            skip, None,
+            min_last_changed_date=min_last_changed_date,
+        )
+        return self._stream(self.LIST_PERFORMANCES_ENDPOINT, {**params, "limit": limit}, Performance)
+
+    def list_leagues(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = 100,
         min_last_changed_date: Optional[date] = None,
-        league_name: Optional[str] = None
+        league_name: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[League]:
         """List leagues with optional filters."""
-        params = {"skip": skip, "limit": limit}
-        if min_last_changed_date:
-            params["min_last_changed_date"] = min_last_changed_date.isoformat()
-        if league_name:
-            params["league_name"] = league_name
-        
-        data = self.call_api("GET", self.LIST_LEAGUES_ENDPOINT, params=params)
-        return [League(**league) for league in data]
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+            league_name=league_name,
+        )
+        return self._list(self.LIST_LEAGUES_ENDPOINT, params, League, limit)
     
     def get_league(self, league_id: int) -> League:
         """Get a specific league by ID."""
         endpoint = f"/v0/leagues/{league_id}"
         data = self.call_api("GET", endpoint)
         return League(**data)
+
+    def get_leagues(self, league_ids: List[int]) -> Batch:
+        """Get several leagues by ID with one request per BATCH_SIZE IDs."""
+        return self._get_batch(self.LIST_LEAGUES_ENDPOINT, league_ids, League)
     
+    def iter_leagues(
+        self,
+        min_last_changed_date: Optional[date] = None,
+        league_name: Optional[str] = None,
+        page_size: Optional[int] = None,
+        prefetch: bool = True
+    ) -> Iterator[League]:
+        """Iterate over every matching league, fetching pages lazily."""
+        params = self._list_params(
+            0, None,
+            min_last_changed_date=min_last_changed_date,
+            league_name=league_name,
+        )
+        return self._iter(self.LIST_LEAGUES_ENDPOINT, params, League, page_size, prefetch)
+
     def list_teams(
         self,
         skip: int = 0,
-        limit: int = 100,
+        limit: Optional[int] = 100,
         min_last_changed_date: Optional[date] = None,
         team_name: Optional[str] = None,
-        league_id: Optional[int] = None
+        league_id: Optional[int] = None,
+        cursor: Optional[str] = None
     ) -> List[Team]:
         """List teams with optional filters."""
-        params = {"skip": skip, "limit": limit}
-        if min_last_changed_date:
-            params["min_last_changed_date"] = min_last_changed_date.isoformat()
-        if team_name:
-            params["team_name"] = team_name
-        if league_id:
-            params["league_id"] = league_id
-        
-        data = self.call_api("GET", self.LIST_TEAMS_ENDPOINT, params=params)
-        return [Team(**team) for team in data]
+        params = self._list_params(
+            skip, cursor,
+            min_last_changed_date=min_last_changed_date,
+            team_name=team_name,
+            league_id=league_id,
+        )
+        return self._list(self.LIST_TEAMS_ENDPOINT, params, Team, limit)
     
     def get_team(self, team_id: int) -> Team:
         """Get a specific team by ID."""
         endpoint = f"/v0/teams/{team_id}"
         data = self.call_api("GET", endpoint)
-        return Team(**data)
\ No newline at end of file
+        return Team(**data)
+
+    def get_teams(self, team_ids: List[int]) -> Batch:
+        """Get several teams by ID with one request per BATCH_SIZE IDs."""
+        return self._get_batch(self.LIST_TEAMS_ENDPOINT, team_ids, Team)
+
+    def iter_teams(
+        self,
+        min_last_changed_date: Optional[date] = None,
+        team_name: Optional[str] = None,
+        league_id: Optional[int] = None,
+        page_size: Optional[int] = None,
+        prefetch: bool = True
+    ) -> Iterator[Team]:
+        """Iterate over every matching team, fetching pages lazily."""
+        params = self._list_params(
+            0, None,
+            min_last_changed_date=min_last_changed_date,
+            team_name=team_name,
+            league_id=league_id,
+        )
+        return self._iter(self.LIST_TEAMS_ENDPOINT, params, Team, page_size, prefetch)
+
+    def get_bulk_file(self, file_key: str, destination: Optional[str] = None) -> Path:
+        """Download a bulk file in the configured format.
+
+        destination may be a file path or an existing directory, and defaults
+        to the current directory. Returns the path of the downloaded file.
+        """
+        path = self._bulk_file_path(file_key, destination)
+        return self.download_file(self.BULK_FILE_BASE_URL + self.BULK_FILE_NAMES[file_key], path)
+
+    def get_bulk_player_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk player file."""
+        return self.get_bulk_file("players", destination)
+
+    def get_bulk_league_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk league file."""
+        return self.get_bulk_file("leagues", destination)
+
+    def get_bulk_performance_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk performance file."""
+        return self.get_bulk_file("performances", destination)
+
+    def get_bulk_team_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk team file."""
+        return self.get_bulk_file("teams", destination)
+
+    def get_bulk_team_player_file(self, destination: Optional[str] = None) -> Path:
+        """Download the bulk team player file."""
+        return self.get_bulk_file("team_players", destination)
+
+    def sync(self, entity: str, state_file: str, limit: int = 1000) -> list:
+        """Fetch the rows of an entity changed since the last sync.
+
+        The watermark of each entity is kept in the JSON file state_file, so
+        the first call returns every row and later calls only the deltas.
+        """
+        endpoint, model = self.CHANGES_ENDPOINTS[entity]
+        watermark = self._read_watermark(state_file, entity)
+
+        changes = []
+        while True:
+            params = {"limit": limit}
+            if watermark:
+                params["watermark"] = watermark
+            data = self.call_api("GET", endpoint, params=params)
+            changes.extend(model(**item) for item in data["items"])
+            watermark = data["next_watermark"]
+            if not data["has_more"]:
+                break
+
+        self._write_watermark(state_file, entity, watermark)
+        logger.debug(f"Synced {len(changes)} {entity} up to watermark {watermark}")
+        return changes
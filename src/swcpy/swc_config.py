@@ -10,19 +10,60 @@ class SWCConfig:
     swc_backoff: bool
     swc_backoff_max_time: int
     swc_bulk_file_format: str
+    swc_timeout: float
+    swc_max_connections: int
+    swc_max_keepalive_connections: int
+    swc_keepalive_expiry: float
+    swc_http2: bool
+    swc_max_concurrency: int
+    swc_validator_cache_size: int
+    swc_compression: bool
+    swc_validator_cache_bytes: int
 
     def __init__(self,swc_base_url:str = None,
                  backoff: bool = True,
                  backoff_max_time: int = 30,
                  bulk_file_format:str = "csv",
+                 timeout: float = 30.0,
+                 max_connections: int = 100,
+                 max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 5.0,
+                 http2: bool = False,
+                 max_concurrency: int = 10,
+                 validator_cache_size: int = 256,
+                 compression: bool = True,
+                 validator_cache_bytes: int = 8 * 1024 * 1024,
     ):
-        """Constructor for config class."""
+        """Constructor for config class.
+
+        The connection settings size the pool the client keeps open between
+        calls. http2 requires the h2 package (pip install "httpx[http2]").
+        max_concurrency caps the requests AsyncSWCClient has in flight.
+        validator_cache_size is how many GET responses are kept for
+        revalidation with If-None-Match; 0 turns revalidation off.
+        validator_cache_bytes caps the bodies they hold, so paging through
+        a large table does not keep every page; larger bodies are not kept.
+        compression asks the API for compressed responses (gzip, plus brotli
+        or zstd when the brotli or zstandard package is installed).
+        """
         self.swc_base_url = swc_base_url
         self.swc_backoff = backoff
         self.swc_backoff_max_time = backoff_max_time
         self.swc_bulk_file_format = bulk_file_format
+        self.swc_timeout = timeout
+        self.swc_max_connections = max_connections
+        self.swc_max_keepalive_connections = max_keepalive_connections
+        self.swc_keepalive_expiry = keepalive_expiry
+        self.swc_http2 = http2
+        self.swc_max_concurrency = max_concurrency
+        self.swc_validator_cache_size = validator_cache_size
+        self.swc_compression = compression
+        self.swc_validator_cache_bytes = validator_cache_bytes
 
     def __str__(self):
         """String representation of the config object."""
-        return f"{self.swc_base_url} {self.swc_backoff} {self.swc_backoff_max_time} {self.swc_bulk_file_format}"
+        return (f"{self.swc_base_url} {self.swc_backoff} {self.swc_backoff_max_time} {self.swc_bulk_file_format} "
+                f"{self.swc_timeout} {self.swc_max_connections} {self.swc_max_keepalive_connections} "
+                f"{self.swc_keepalive_expiry} {self.swc_http2} {self.swc_max_concurrency} {self.swc_validator_cache_size} "
+                f"{self.swc_compression} {self.swc_validator_cache_bytes}")
     
@@ -0,0 +1,184 @@
+#generate a referentially consistent synthetic dataset at a multiple of the
+#size of the bundled data, the same for the same seed
+#usage: python synthetic.py db [database_url] [scale] [seasons] [seed]
+#       python synthetic.py csv [directory] [scale] [seasons] [seed]
+#       python synthetic.py parquet [directory] [scale] [seasons] [seed]
+import csv
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from sqlalchemy import create_engine
+import importer
+import migrations
+import models
+import parquet_io
+
+#row counts of the bundled data, the size at scale 1
+LEAGUES = 5
+TEAMS_PER_LEAGUE = 4
+PLAYERS = 1018
+PLAYERS_PER_TEAM = 7
+WEEKS = 17
+LAST_SEASON = 2023
+
+#position mix and points range of the bundled players and performances
+POSITIONS = {"WR": 415, "RB": 229, "TE": 206, "QB": 123, "K": 45}
+MIN_POINTS, MAX_POINTS = 1, 25
+SCORING_TYPES = ["PPR", "Half-PPR", "Standard"]
+
+FIRST_NAMES = ["Aaron", "Bryce", "Caleb", "Derek", "Evan", "Frank", "Grant", "Henry",
+               "Isaiah", "Jalen", "Kyle", "Logan", "Marcus", "Nate", "Owen", "Patrick",
+               "Quinn", "Russell", "Sam", "Tyler", "Victor", "Wyatt", "Xavier", "Zach"]
+LAST_NAMES = ["Adams", "Brown", "Carter", "Davis", "Evans", "Foster", "Green", "Harris",
+              "Irving", "Johnson", "King", "Lewis", "Moore", "Nelson", "Owens", "Parker",
+              "Reed", "Smith", "Taylor", "Underwood", "Walker", "Wilson", "Wright", "Young"]
+NAME_WORDS = ["Blitz", "Gridiron", "Pigskin", "Endzone", "Sideline", "Huddle", "Red Zone",
+              "Hail Mary", "Fourth Down", "Two Minute", "Touchback", "Audible"]
+
+def _rng(seed, table_name: str) -> random.Random:
+    """Random numbers of one table, so each table is the same however the others are read"""
+    return random.Random(f"{seed}-{table_name}")
+
+def _changed(rng: random.Random, start: datetime, days: int) -> datetime:
+    return start + timedelta(days = rng.randrange(days))
+
+def _leagues(scale: int, seed):
+    rng = _rng(seed, "league")
+    for index in range(LEAGUES * scale):
+        yield {"league_id": 5001 + index,
+               "league_name": f"{rng.choice(NAME_WORDS)} League {index + 1}",
+               "scoring_type": rng.choice(SCORING_TYPES),
+               "last_changed_date": _changed(rng, datetime(2024, 4, 1), 30)}
+
+def _teams(scale: int, seed):
+    rng = _rng(seed, "team")
+    for index in range(LEAGUES * TEAMS_PER_LEAGUE * scale):
+        yield {"team_id": 1001 + index,
+               "team_name": f"{rng.choice(NAME_WORDS)} {rng.choice(LAST_NAMES)}s {index + 1}",
+               "league_id": 5001 + index // TEAMS_PER_LEAGUE,
+               "last_changed_date": _changed(rng, datetime(2024, 4, 1), 30)}
+
+def _players(scale: int, seed):
+    rng = _rng(seed, "player")
+    positions, weights = list(POSITIONS), list(POSITIONS.values())
+    for index in range(PLAYERS * scale):
+        yield {"player_id": 1001 + index,
+               "gsis_id": f"00-{index + 1:07d}",
+               "first_name": rng.choice(FIRST_NAMES),
+               "last_name": rng.choice(LAST_NAMES),
+               "position": rng.choices(positions, weights)[0],
+               "last_changed_date": _changed(rng, datetime(2024, 4, 1), 30)}
+
+def _team_players(scale: int, seed):
+    rng = _rng(seed, "team_player")
+    teams = LEAGUES * TEAMS_PER_LEAGUE * scale
+    #like the bundled data, no player is on more than one team
+    player_indexes = rng.sample(range(PLAYERS * scale), teams * PLAYERS_PER_TEAM)
+    for team_index in range(teams):
+        roster = player_indexes[team_index * PLAYERS_PER_TEAM:(team_index + 1) * PLAYERS_PER_TEAM]
+        for player_index in sorted(roster):
+            yield {"team_id": 1001 + team_index,
+                   "player_id": 1001 + player_index,
+                   "last_changed_date": _changed(rng, datetime(2024, 4, 1), 30)}
+
+def _performances(scale: int, seasons: int, seed):
+    rng = _rng(seed, "performance")
+    performance_id = 2501
+    for season in range(LAST_SEASON - seasons + 1, LAST_SEASON + 1):
+        #performances change over the months after their season, like the bundled ones
+        changed_from = datetime(season + 1, 3, 1)
+        for week in range(1, WEEKS + 1):
+            week_number = f"{season}{week:02d}"
+            for player_index in range(PLAYERS * scale):
+                yield {"performance_id": performance_id,
+                       "week_number": week_number,
+                       "fantasy_points": rng.randint(MIN_POINTS, MAX_POINTS),
+                       "player_id": 1001 + player_index,
+                       "last_changed_date": _changed(rng, changed_from, 91)}
+                performance_id += 1
+
+def _batched(rows, batch_size: int):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+def generate(scale: int = 1, seasons: int = 1, seed = 0, batch_size: int = importer.BATCH_SIZE):
+    """(model, batches of row dicts) for every table, parents first.
+
+    scale multiplies leagues, teams, players and team_player links; every
+    player has a performance in each of the 17 weeks of each season.
+    """
+    return [
+        (models.League, _batched(_leagues(scale, seed), batch_size)),
+        (models.Team, _batched(_teams(scale, seed), batch_size)),
+        (models.Player, _batched(_players(scale, seed), batch_size)),
+        (models.TeamPlayer, _batched(_team_players(scale, seed), batch_size)),
+        (models.Performance, _batched(_performances(scale, seasons, seed), batch_size)),
+    ]
+
+def write_db(bind, scale: int = 1, seasons: int = 1, seed = 0) -> dict:
+    """Upsert a generated dataset into a database, returning rows written per table"""
+    return importer.load_batches(bind, ((model.__table__, batches)
+                                        for model, batches in generate(scale, seasons, seed)))
+
+def write_csv(directory, scale: int = 1, seasons: int = 1, seed = 0) -> dict:
+    """Write a generated dataset as the data/*.csv files, returning rows written per table"""
+    directory = Path(directory)
+    directory.mkdir(parents = True, exist_ok = True)
+    counts = {}
+    for (file_name, _), (model, batches) in zip(importer.LOAD_ORDER, generate(scale, seasons, seed)):
+        names = [column.name for column in models.data_columns(model.__table__)]
+        counts[model.__tablename__] = 0
+        with open(directory / file_name, "w", newline = "") as file:
+            writer = csv.writer(file)
+            writer.writerow(names)
+            for rows in batches:
+                #dates are written as whole days, like the bundled files
+                writer.writerows([row[name].date().isoformat() if isinstance(row[name], datetime)
+                                  else row[name] for name in names] for row in rows)
+                counts[model.__tablename__] += len(rows)
+    return counts
+
+def write_parquet(directory, scale: int = 1, seasons: int = 1, seed = 0) -> dict:
+    """Write a generated dataset as the parquet_io files, returning rows written per table"""
+    directory = Path(directory)
+    directory.mkdir(parents = True, exist_ok = True)
+    counts = {}
+    for (file_name, _), (model, batches) in zip(parquet_io.PARQUET_FILES,
+                                               generate(scale, seasons, seed, parquet_io.ROW_GROUP_SIZE)):
+        names = [column.name for column in models.data_columns(model.__table__)]
+        counts[model.__tablename__] = 0
+
+        def rows_in_column_order(batches = batches, table_name = model.__tablename__):
+            for rows in batches:
+                counts[table_name] += len(rows)
+                yield [tuple(row[name] for name in names) for row in rows]
+
+        parquet_io.write_batches(directory / file_name, model, rows_in_column_order())
+    return counts
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "db"
+    scale = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    seasons = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    seed = sys.argv[5] if len(sys.argv) > 5 else 0
+    start = time.perf_counter()
+    if command == "db":
+        #a separate file by default, so the bundled database is never overwritten
+        bind = create_engine(sys.argv[2] if len(sys.argv) > 2 else "sqlite:///synthetic.db")
+        migrations.upgrade(bind)
+        counts = write_db(bind, scale, seasons, seed)
+    elif command == "csv":
+        counts = write_csv(sys.argv[2] if len(sys.argv) > 2 else "synthetic", scale, seasons, seed)
+    elif command == "parquet":
+        counts = write_parquet(sys.argv[2] if len(sys.argv) > 2 else "synthetic", scale, seasons, seed)
+    else:
+        sys.exit(f"Unknown command {command}, expected db, csv or parquet")
+    elapsed = time.perf_counter() - start
+    for table_name, rows in counts.items():
+        print(f"{table_name}: {rows} rows")
+    total = sum(counts.values())
+    print(f"Wrote {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/sec)")
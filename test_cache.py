@@ -0,0 +1,65 @@
+#the pytest for the response cache
+import cache
+
+def test_hit_and_version_invalidation():
+    response_cache = cache.ResponseCache()
+    assert response_cache.get("players", (1,)) is None
+    response_cache.set("players", (1,), b"[]", {"X-Next-Cursor": "abc"})
+
+    entry = response_cache.get("players", (1,))
+    assert entry.body == b"[]"
+    assert entry.headers == {"X-Next-Cursor": "abc"}
+
+    # the table changed since the entry was built
+    assert response_cache.get("players", (2,)) is None
+    stats = response_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+    assert stats["entries"] == 0
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    response_cache = cache.ResponseCache(ttl_seconds = 60)
+    response_cache.set("counts", (1,), b"{}")
+    now[0] += 59
+    assert response_cache.get("counts", (1,)) is not None
+    now[0] += 2
+    assert response_cache.get("counts", (1,)) is None
+    assert response_cache.stats()["expirations"] == 1
+
+def test_lru_eviction_by_entries_and_bytes():
+    response_cache = cache.ResponseCache(max_entries = 2, max_bytes = 10)
+    response_cache.set("a", (1,), b"1234")
+    response_cache.set("b", (1,), b"1234")
+    response_cache.get("a", (1,))
+    # "b" is now least recently used
+    response_cache.set("c", (1,), b"1234")
+    assert response_cache.get("b", (1,)) is None
+    assert response_cache.get("a", (1,)) is not None
+
+    # over the byte cap evicts as well, and oversized bodies are not stored
+    response_cache.set("d", (1,), b"12345678")
+    assert response_cache.stats()["size_bytes"] <= 10
+    response_cache.set("e", (1,), b"x" * 11)
+    assert response_cache.get("e", (1,)) is None
+    assert response_cache.stats()["evictions"] == 3
+
+def test_encoded_copies_count_against_size():
+    response_cache = cache.ResponseCache(max_bytes = 20)
+    entry = response_cache.set("a", (1,), b"12345678")
+    assert response_cache.add_encoding("a", entry, "gzip", b"1234") == b"1234"
+    assert response_cache.get("a", (1,)).encoded == {"gzip": b"1234"}
+    assert response_cache.stats()["size_bytes"] == 12
+
+    # a copy that no longer fits evicts entries like any other growth
+    response_cache.add_encoding("a", entry, "br", b"x" * 9)
+    assert response_cache.stats()["size_bytes"] == 0
+    assert response_cache.get("a", (1,)) is None
+
+def test_entry_digest_follows_body():
+    response_cache = cache.ResponseCache()
+    first = response_cache.set("players", (1,), b"[1]")
+    same = response_cache.set("players", (2,), b"[1]")
+    changed = response_cache.set("players", (3,), b"[2]")
+    assert first.digest == same.digest != changed.digest
+    assert len(first.digest) == 32
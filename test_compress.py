@@ -0,0 +1,24 @@
+#the pytest for response compression
+import gzip
+import compress
+
+def test_parse_accept_encoding():
+    assert compress.parse_accept_encoding("gzip, br;q=0.5, zstd;q=0") == {
+        "gzip": 1.0, "br": 0.5, "zstd": 0.0}
+    assert compress.parse_accept_encoding("") == {}
+
+def test_choose_encoding(monkeypatch):
+    monkeypatch.setitem(compress.ENCODERS, "br", compress.ENCODERS["gzip"])
+    assert compress.choose_encoding("gzip, deflate") == "gzip"
+    # equal quality goes to the server preference, higher quality wins
+    assert compress.choose_encoding("gzip, br") == "br"
+    assert compress.choose_encoding("gzip, br;q=0.5") == "gzip"
+    assert compress.choose_encoding("*") == "br"
+    assert compress.choose_encoding("gzip;q=0, identity") is None
+    assert compress.choose_encoding(None) is None
+
+def test_compress_round_trip():
+    body = b'{"player_id": 1001}' * 1000
+    compressed = compress.compress(body, "gzip")
+    assert gzip.decompress(compressed) == body
+    assert len(compressed) * 10 < len(body)
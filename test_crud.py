@@ -1,89 +1,38 @@
 #the pytest for unit test of the db
 import pytest
+from contextlib import contextmanager
 from datetime import date, datetime
-import csv
-import os
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import Session
 import crud
+import importer
 from database import SessionLocal, engine, Base
+import migrations
 import models
+import schemas
 
 #test date set to before data dates (2024) to ensure data is returned
 test_date = date(2023, 1, 1)
 
-def load_data(session):
-    print("Loading data from CSVs...")
-    # Leagues
-    if os.path.exists('data/league_data.csv'):
-        with open('data/league_data.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                session.merge(models.League(
-                    league_id=int(row['league_id']),
-                    league_name=row['league_name'],
-                    scoring_type=row['scoring_type'],
-                    last_changed_date=datetime.strptime(row['last_changed_date'], '%Y-%m-%d')
-                ))
-            
-    # Teams
-    if os.path.exists('data/team_data.csv'):
-        with open('data/team_data.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                session.merge(models.Team(
-                    team_id=int(row['team_id']),
-                    team_name=row['team_name'],
-                    league_id=int(row['league_id']),
-                    last_changed_date=datetime.strptime(row['last_changed_date'], '%Y-%m-%d')
-                ))
-
-    # Players
-    if os.path.exists('data/player_data.csv'):
-        with open('data/player_data.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                session.merge(models.Player(
-                    player_id=int(row['player_id']),
-                    gsis_id=row['gsis_id'],
-                    first_name=row['first_name'],
-                    last_name=row['last_name'],
-                    position=row['position'],
-                    last_changed_date=datetime.strptime(row['last_changed_date'], '%Y-%m-%d')
-                ))
-            
-    # TeamPlayer
-    if os.path.exists('data/team_player_data.csv'):
-        with open('data/team_player_data.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                session.merge(models.TeamPlayer(
-                    team_id=int(row['team_id']),
-                    player_id=int(row['player_id']),
-                    last_changed_date=datetime.strptime(row['last_changed_date'], '%Y-%m-%d')
-                ))
-
-    # Performance
-    if os.path.exists('data/performance_data.csv'):
-        with open('data/performance_data.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                session.merge(models.Performance(
-                    performance_id=int(row['performance_id']),
-                    week_number=row['week_number'],
-                    fantasy_points=int(row['fantasy_points']),
-                    player_id=int(row['player_id']),
-                    last_changed_date=datetime.strptime(row['last_changed_date'], '%Y-%m-%d')
-                ))
-    
-    session.commit()
-    print("Data loaded.")
+@contextmanager
+def record_queries():
+    """Collect the SQL statements executed on the engine"""
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
-    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
     session = SessionLocal()
     # Check if data exists, if not load it
     if session.query(models.Player).count() == 0:
-        load_data(session)
+        importer.load_all(engine)
     session.close()
 
 @pytest.fixture(scope = "function")
@@ -124,3 +73,144 @@ def test_get_all_performances(db_session):
 def test_get_player_count(db_session):
     player_count = crud.get_player_count(db_session)
     assert player_count == 1018
+
+def test_get_counts_is_one_query(db_session):
+    with record_queries() as statements:
+        counts = crud.get_counts(db_session)
+    assert len(statements) == 1
+    assert counts == {"league_count": 5, "team_count": 20, "player_count": 1018,
+                      "performance_count": 17306, "team_player_count": 140}
+
+@pytest.mark.parametrize("get_items,response_model", [
+    (crud.get_players, schemas.Player),
+    (crud.get_performances, schemas.Performance),
+    (crud.get_leagues, schemas.League),
+    (crud.get_teams, schemas.Team),
+])
+def test_list_query_count_is_constant(db_session, get_items, response_model):
+    # serializing a small and a full page must cost the same number of queries
+    query_counts = []
+    for limit in (5, 20000):
+        db_session.expunge_all()
+        with record_queries() as statements:
+            items = get_items(db_session, skip = 0, limit = limit)
+            [response_model.model_validate(item) for item in items]
+        query_counts.append(len(statements))
+    assert query_counts[0] == query_counts[1]
+    assert query_counts[0] <= 2
+
+def test_get_players_loads_only_requested_fields(db_session):
+    #columns outside fields are not selected and skipped relationships are not queried
+    db_session.expunge_all()
+    with record_queries() as statements:
+        players = crud.get_players(db_session, limit = 20, fields = ("player_id", "last_name"), include = ())
+        [player.last_name for player in players]
+    assert len(statements) == 1
+    assert "gsis_id" not in statements[0][0]
+
+@pytest.mark.parametrize("get_items,filters,index_names", [
+    (crud.get_players, {"first_name": "Bryce"}, ["ix_player_first_name", "ix_performance_player_id"]),
+    (crud.get_players, {"last_name": "Young"}, ["ix_player_last_name", "ix_performance_player_id"]),
+    (crud.get_players, {"first_name": "Bryce", "last_name": "Young"}, ["ix_player_", "ix_performance_player_id"]),
+    (crud.get_leagues, {"league_name": "Recurring Champions League"}, ["ix_league_league_name", "ix_team_league_id"]),
+    (crud.get_teams, {"team_name": "Roaring Kitties"}, ["ix_team_team_name", "sqlite_autoindex_team_player_1"]),
+    (crud.get_teams, {"league_id": 5001}, ["ix_team_league_id", "sqlite_autoindex_team_player_1"]),
+    (crud.get_teams, {"team_name": "Roaring Kitties", "league_id": 5001}, ["ix_team_", "sqlite_autoindex_team_player_1"]),
+])
+def test_list_filters_use_indexes(db_session, get_items, filters, index_names):
+    with record_queries() as statements:
+        get_items(db_session, **filters)
+    assert len(statements) == len(index_names)
+    with engine.connect() as conn:
+        for (statement, parameters), index_name in zip(statements, index_names):
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            details = " ".join(row[-1] for row in plan)
+            assert f"INDEX {index_name}" in details
+
+def test_change_feed_uses_change_seq_index(db_session):
+    with record_queries() as statements:
+        crud.get_changes(db_session, models.Performance, limit = 10, after = [2600])
+    (statement, parameters), = statements
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert "INDEX ix_performance_change_seq" in details
+    assert "TEMP B-TREE" not in details
+
+def test_player_season_totals_match_performances(db_session):
+    performances = crud.get_performances(db_session, limit = 20000)
+    points = [p.fantasy_points for p in performances if p.player_id == 1001]
+    total, = crud.get_player_season_totals(db_session, player_id = 1001)
+    assert (total.season, total.games_played, total.total_points) == (2023, len(points), sum(points))
+    assert total.average_points == round(sum(points) / len(points), 2)
+
+    top = crud.get_top_players(db_session, season = 2023, position = "QB", limit = 3)
+    assert [row.position for row in top] == ["QB"] * 3
+    assert top[0].total_points >= top[1].total_points >= top[2].total_points
+
+def test_change_feed_returns_every_write_after_watermark(tmp_path):
+    temp_engine = create_engine(f"sqlite:///{tmp_path / 'changes.db'}")
+    migrations.upgrade(temp_engine)
+    importer.load_all(temp_engine)
+    with Session(temp_engine) as session:
+        rows = crud.get_changes(session, models.Player, limit = 2000)
+        assert len(rows) == 1018
+        after = [rows[-1].change_seq]
+
+        # same day edits to ids below the last one synced, through the orm and core
+        player = session.get(models.Player, 1001)
+        player.last_name = "Edited"
+        player.last_changed_date = datetime(2024, 4, 18)
+        session.commit()
+        session.execute(update(models.Player).where(models.Player.player_id == 1002).values(first_name = "Edited"))
+        # writing back the values a row already holds is not a change
+        session.execute(update(models.Player).where(models.Player.player_id == 1003)
+                        .values(position = models.Player.position))
+        session.commit()
+        assert [row.player_id for row in crud.get_changes(session, models.Player, after = after)] == [1001, 1002]
+
+    # nor is reloading the same files
+    importer.load_all(temp_engine)
+    with Session(temp_engine) as session:
+        assert len(crud.get_changes(session, models.Player, after = after)) == 2
+
+def test_data_version_moves_on_deletes_without_counting(tmp_path):
+    temp_engine = create_engine(f"sqlite:///{tmp_path / 'version.db'}")
+    migrations.upgrade(temp_engine)
+    importer.load_all(temp_engine)
+    statements = []
+    event.listen(temp_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    with Session(temp_engine) as session:
+        version = crud.get_data_version(session, models.Player, models.Performance)
+        assert "count(" not in " ".join(statements).lower()
+
+        session.delete(session.get(models.Performance, 2501))
+        session.commit()
+        changed = crud.get_data_version(session, models.Player, models.Performance)
+        assert changed[0] == version[0] and changed[1] > version[1]
+
+def test_season_summary_follows_performance_writes(tmp_path):
+    temp_engine = create_engine(f"sqlite:///{tmp_path / 'summary.db'}")
+    migrations.upgrade(temp_engine)
+    importer.load_all(temp_engine)
+    statements = []
+    event.listen(temp_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    with Session(temp_engine) as session:
+        total, = crud.get_player_season_totals(session, player_id = 1001)
+        assert (total.games_played, total.total_points) == (17, 215)
+        # reads never write, so they also work on a read-only database
+        assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+        # a same day edit leaves the row count and latest date as they were
+        performance = session.get(models.Performance, 2501)
+        performance.fantasy_points += 10
+        session.commit()
+        total, = crud.get_player_season_totals(session, player_id = 1001)
+        assert (total.games_played, total.total_points) == (17, 225)
+
+        session.delete(session.query(models.Performance).filter_by(player_id = 1001, week_number = "202302").one())
+        session.commit()
+        total, = crud.get_player_season_totals(session, player_id = 1001)
+        assert total.games_played == 16
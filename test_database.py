@@ -0,0 +1,157 @@
+#the pytest for the engine configuration in database.py
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import event, exc, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql import ClauseElement
+import crud
+import database
+import models
+
+def test_sqlite_pragma_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("SWC_SQLITE_MMAP_SIZE", "1048576")
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    with engine.connect() as connection:
+        settings = database.get_sqlite_settings(connection)
+    assert settings["journal_mode"] == "wal"
+    assert settings["synchronous"] == "1"
+    assert settings["cache_size"] == "-65536"
+    assert settings["mmap_size"] == "1048576"
+    assert settings["temp_store"] == "2"
+    assert settings["busy_timeout"] == "5000"
+
+def test_read_only_engine_rejects_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    with database.create_db_engine(url).begin() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO item VALUES (1)"))
+
+    replica = database.create_db_engine(url, read_only = True)
+    with replica.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM item")).scalar() == 1
+        with pytest.raises(exc.OperationalError, match = "readonly"):
+            connection.execute(text("INSERT INTO item VALUES (2)"))
+
+def test_pool_bounds_concurrent_connections(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                                       pool_size = 2, max_overflow = 0, pool_timeout = 5)
+    checked_out = []
+    lock = threading.Lock()
+
+    def query(_):
+        with engine.connect() as connection:
+            with lock:
+                checked_out.append(engine.pool.checkedout())
+            time.sleep(0.02)
+            return connection.execute(text("SELECT 1")).scalar()
+
+    with ThreadPoolExecutor(max_workers = 8) as executor:
+        assert list(executor.map(query, range(32))) == [1] * 32
+    assert max(checked_out) == 2
+
+    # with the pool exhausted a further checkout waits pool_timeout and fails
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                                       pool_size = 1, max_overflow = 0, pool_timeout = 0.1)
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+def test_memory_engine_is_shared_across_threads():
+    engine = database.create_db_engine("sqlite://", pool_size = 2)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO item VALUES (1)"))
+
+    def count():
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT count(*) FROM item")).scalar()
+    with ThreadPoolExecutor(max_workers = 2) as executor:
+        assert executor.submit(count).result() == 1
+
+def test_schema_compiles_for_postgresql():
+    dialect = postgresql.dialect()
+    for table in database.Base.metadata.sorted_tables:
+        assert "CREATE TABLE" in str(CreateTable(table).compile(dialect = dialect))
+        for index in table.indexes:
+            str(CreateIndex(index).compile(dialect = dialect))
+
+def test_crud_queries_compile_for_postgresql():
+    statements = []
+    def before_execute(conn, clauseelement, multiparams, params, execution_options):
+        if isinstance(clauseelement, ClauseElement):
+            statements.append(clauseelement)
+    event.listen(database.engine, "before_execute", before_execute)
+    try:
+        with database.SessionLocal() as db:
+            crud.get_players(db, first_name = "Bryce", after_id = 1000)
+            crud.get_teams(db, league_id = 5001)
+            crud.get_changes(db, models.Performance, after = [100])
+            crud.get_data_version(db, models.Player, models.Performance)
+            crud.get_counts(db)
+            crud.get_player_season_totals(db, season = 2023, position = "QB")
+            crud.get_team_season_totals(db, league_id = 5001)
+            crud.get_weekly_averages(db, season = 2023, position = "K")
+            crud.get_league_standings(db, league_id = 5001)
+            crud.get_position_leaders(db, position = "QB", week_number = "202301")
+    finally:
+        event.remove(database.engine, "before_execute", before_execute)
+
+    assert len(statements) >= 10
+    for statement in statements:
+        str(statement.compile(dialect = postgresql.dialect()))
+
+@pytest.fixture
+def replicated(tmp_path):
+    """Copies of the database as a primary and two replicas, each replica's league 5001 renamed after it"""
+    urls = {}
+    with sqlite3.connect("fantasy_football.db") as source:
+        for name in ("primary", "replica_a", "replica_b"):
+            path = tmp_path / f"{name}.db"
+            with sqlite3.connect(path) as copy:
+                source.backup(copy)
+                copy.execute("UPDATE league SET league_name = ? WHERE league_id = 5001", (name,))
+            urls[name] = f"sqlite:///{path}"
+    return urls
+
+def routing_sessions(urls, strategy = "round_robin"):
+    replicas = [database.create_db_engine(urls[name], read_only = True)
+                for name in ("replica_a", "replica_b")]
+    return sessionmaker(class_ = database.RoutingSession, autoflush = False,
+                        bind = database.create_db_engine(urls["primary"]),
+                        replicas = replicas, strategy = strategy), replicas
+
+def league_name(session):
+    return crud.get_league(session, league_id = 5001).league_name
+
+def test_reads_go_to_replicas_in_turn(replicated):
+    Sessions, _ = routing_sessions(replicated)
+    names = []
+    for _ in range(4):
+        with Sessions() as session:
+            names.append(league_name(session))
+    assert set(names) == {"replica_a", "replica_b"}
+    assert names[0] != names[1] and names[:2] == names[2:]
+
+def test_least_busy_replica_is_chosen(replicated):
+    Sessions, replicas = routing_sessions(replicated, strategy = "least_busy")
+    with replicas[0].connect():
+        with Sessions() as session:
+            assert league_name(session) == "replica_b"
+
+def test_writes_go_to_primary_and_are_read_back(replicated):
+    Sessions, _ = routing_sessions(replicated)
+    with Sessions() as session:
+        assert league_name(session).startswith("replica")
+        crud.get_league(session, league_id = 5001).league_name = "renamed"
+        session.commit()
+        assert league_name(session) == "renamed"
+
+    with sqlite3.connect(replicated["primary"].removeprefix("sqlite:///")) as primary:
+        assert primary.execute("SELECT league_name FROM league WHERE league_id = 5001").fetchone() == ("renamed",)
+    with Sessions() as session:
+        assert league_name(session).startswith("replica")
@@ -0,0 +1,25 @@
+#the pytest for the bulk csv importer
+from datetime import datetime
+from sqlalchemy import create_engine, func, select
+import importer
+import migrations
+import models
+
+def test_load_all_upserts_every_csv(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    migrations.upgrade(engine)
+
+    counts = importer.load_all(engine, batch_size = 1000)
+    assert counts == {"league": 5, "team": 20, "player": 1018,
+                      "team_player": 140, "performance": 17306}
+
+    # loading again updates rows in place instead of failing or duplicating
+    assert importer.load_all(engine) == counts
+    with engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(models.Performance)) == 17306
+        performance = connection.execute(
+            select(models.Performance).where(models.Performance.performance_id == 2501)).one()
+        # load pragmas do not outlive the load
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 2
+    assert performance.week_number == "202301"
+    assert performance.last_changed_date == datetime(2024, 3, 1)
@@ -0,0 +1,96 @@
+#the pytest for the incrementally maintained leaderboard tables
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+import importer
+import leaderboards
+import migrations
+import models
+
+def snapshot(session):
+    """Rows of both leaderboard tables and the season summary"""
+    return [session.execute(select(table).order_by(*table.primary_key.columns)).all()
+            for table in (leaderboards.player_week_score, leaderboards.team_week_score,
+                          leaderboards.player_season_summary)]
+
+def rebuilt(session):
+    """Rows of the same tables when recomputed from scratch"""
+    savepoint = session.begin_nested()
+    leaderboards.rebuild(session.connection())
+    rows = snapshot(session)
+    savepoint.rollback()
+    return rows
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leaderboards.db'}")
+    migrations.upgrade(engine)
+    importer.load_all(engine)
+    with Session(engine) as session:
+        yield session
+
+def test_load_builds_leaderboards(session):
+    player_rows, team_rows, summary_rows = snapshot(session)
+    assert sum(row.performance_count for row in player_rows) == 17306
+    assert len(team_rows) > 0
+    assert sum(row.games_played for row in summary_rows) == 17306
+
+def test_orm_writes_update_leaderboards_incrementally(session):
+    session.add(models.Performance(performance_id = 90001, week_number = "202318",
+                                   fantasy_points = 30, player_id = 1001,
+                                   last_changed_date = session.get(models.Performance, 2501).last_changed_date))
+    session.flush()
+    assert snapshot(session) == rebuilt(session)
+
+    session.get(models.Performance, 2501).fantasy_points += 7
+    session.get(models.Performance, 2502).week_number = "202318"
+    session.flush()
+    assert snapshot(session) == rebuilt(session)
+
+    session.delete(session.get(models.Performance, 90001))
+    team_player = session.scalars(select(models.TeamPlayer).limit(1)).one()
+    session.delete(team_player)
+    session.get(models.Player, 1002).position = "WR"
+    session.flush()
+    assert snapshot(session) == rebuilt(session)
+
+def test_writers_without_crud_keep_leaderboards_current(tmp_path):
+    # the listener comes with database.py, so a script that never imports
+    # crud or leaderboards still maintains the tables
+    engine_url = f"sqlite:///{tmp_path / 'leaderboards.db'}"
+    engine = create_engine(engine_url)
+    migrations.upgrade(engine)
+    importer.load_all(engine)
+    script = f"""
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+import models
+with Session(create_engine({engine_url!r})) as session:
+    session.get(models.Performance, 2501).fantasy_points += 5
+    session.commit()
+assert "leaderboards" in sys.modules and "crud" not in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", script], check = True, cwd = Path(__file__).parent)
+    with Session(engine) as session:
+        assert snapshot(session) == rebuilt(session)
+
+def test_flush_deletes_only_emptied_keys(session):
+    statements = []
+    event.listen(session.bind, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    session.get(models.Performance, 2501).fantasy_points += 1
+    session.flush()
+    # a change in points empties no leaderboard row, so nothing is deleted from them
+    assert not [statement for statement in statements if statement.startswith("DELETE")
+                and "_week_score" in statement]
+
+    session.delete(session.get(models.Performance, 2502))
+    session.flush()
+    deletes = [statement for statement in statements if statement.startswith("DELETE FROM")
+               and "_week_score" in statement]
+    assert deletes and all(" IN " in statement for statement in deletes)
+    assert snapshot(session) == rebuilt(session)
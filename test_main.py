@@ -1,4 +1,20 @@
+import asyncio
+import hashlib
+import inspect
+import io
+import json
+import threading
+import pytest
+import pyarrow.parquet as pq
+from fastapi import Request
 from fastapi.testclient import TestClient
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+import database
+import main
+import models
 from main import app
 
 client = TestClient(app)
@@ -24,6 +40,31 @@ def test_read_players_with_id():
     assert response.status_code == 200
     assert response.json().get("player_id") == 1001
 
+# test batch lookups keep the order asked and report unknown ids
+def test_read_players_batch():
+    response = client.get("/v0/players/batch/?ids=1009,1001,99999,1001")
+    assert response.status_code == 200
+    assert [player["player_id"] for player in response.json()["items"]] == [1009, 1001]
+    assert response.json()["not_found"] == [99999]
+    assert response.json()["items"][1] == client.get("/v0/players/1001").json()
+
+# test fields and include narrow the response to the columns and collections asked for
+def test_read_players_with_fields():
+    response = client.get("/v0/players/?limit=2&fields=player_id,last_name")
+    assert response.json() == [{"player_id": 1001, "last_name": "Rodgers"},
+                                {"player_id": 1002, "last_name": "Prater"}]
+    response = client.get("/v0/players/1001?fields=last_name&include=performances")
+    assert response.json()["performances"] == client.get("/v0/players/1001").json()["performances"]
+    response = client.get("/v0/teams/1001?include=")
+    assert "players" not in response.json()
+    assert response.json()["team_name"] == "Roaring Kitties"
+    assert client.get("/v0/performances/?include=player").status_code == 400
+
+def test_read_batch_with_invalid_ids():
+    assert client.get("/v0/teams/batch/?ids=1,x").status_code == 400
+    ids = ",".join(str(team_id) for team_id in range(main.MAX_BATCH_IDS + 1))
+    assert client.get(f"/v0/teams/batch/?ids={ids}").status_code == 400
+
 # test /v0/performances/
 def test_read_performances():
     response = client.get("/v0/performances/?skip=0&limit=20000")
@@ -43,4 +84,294 @@ def test_counts():
     assert response.status_code == 200
     assert response.json()["league_count"] == 5
     assert response.json()["team_count"] == 20
-    assert response.json()["player_count"] == 1018
\ No newline at end of file
+    assert response.json()["player_count"] == 1018
+    assert response.json()["performance_count"] == 17306
+    assert response.json()["team_player_count"] == 140
+# test cursor pagination walks every row exactly once
+def test_read_performances_with_cursor():
+    performance_ids = []
+    params = {"limit": 5000}
+    while True:
+        response = client.get("/v0/performances/", params = params)
+        assert response.status_code == 200
+        performance_ids.extend(p["performance_id"] for p in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params["cursor"] = next_cursor
+    assert len(performance_ids) == 17306
+    assert performance_ids == sorted(set(performance_ids))
+
+def test_read_players_with_invalid_cursor():
+    response = client.get("/v0/players/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+# test the change feed resumes from its watermark without gaps or repeats
+def test_read_performance_changes():
+    performance_ids = []
+    params = {"limit": 5000}
+    while True:
+        response = client.get("/v0/changes/performances/", params = params)
+        assert response.status_code == 200
+        feed = response.json()
+        performance_ids.extend(p["performance_id"] for p in feed["items"])
+        params["watermark"] = feed["next_watermark"]
+        if not feed["has_more"]:
+            break
+    assert len(performance_ids) == len(set(performance_ids)) == 17306
+
+    # nothing changed since the final watermark
+    response = client.get("/v0/changes/performances/", params = params)
+    assert response.json() == {"items": [], "next_watermark": params["watermark"], "has_more": False}
+
+@pytest.fixture
+def scratch_db(request, tmp_path, monkeypatch):
+    """Serve requests from a copy of the database that the test may write to,
+    or open read-only when parametrized with True"""
+    read_only = getattr(request, "param", False)
+    path = tmp_path / "scratch.db"
+    with database.engine.connect() as connection:
+        connection.exec_driver_sql(f"VACUUM INTO '{path}'")
+    url = f"sqlite:///{path}"
+    scratch_engine = database.create_db_engine(url, read_only = read_only)
+    scratch_session = sessionmaker(bind = scratch_engine)
+    def get_db():
+        with scratch_session() as db:
+            yield db
+    app.dependency_overrides[main.get_db] = get_db
+    if database.ASYNC_DB:
+        monkeypatch.setattr(database, "AsyncSessionLocal",
+                            async_sessionmaker(database.create_async_db_engine(database.get_async_url(url),
+                                                                               read_only = read_only)))
+    main.response_cache.clear()
+    yield scratch_session
+    del app.dependency_overrides[main.get_db]
+    main.response_cache.clear()
+    scratch_engine.dispose()
+
+# test a same day edit to a row below the last one synced is the next change
+def test_change_feed_returns_same_day_edit_to_lower_id(scratch_db):
+    params = {"limit": 5000}
+    response = client.get("/v0/changes/players/", params = params)
+    assert len(response.json()["items"]) == 1018
+    params["watermark"] = response.json()["next_watermark"]
+
+    with scratch_db() as db:
+        player = db.get(models.Player, 1001)
+        player.last_name = "Edited"
+        player.last_changed_date = datetime(2024, 4, 18)
+        db.commit()
+
+    feed = client.get("/v0/changes/players/", params = params).json()
+    assert [(p["player_id"], p["last_name"]) for p in feed["items"]] == [(1001, "Edited")]
+    assert feed["next_watermark"] != params["watermark"]
+
+# test a feed call must ask for at least one row, or it could never move on
+@pytest.mark.parametrize("limit", [0, -1, 10001])
+def test_read_changes_rejects_limit_out_of_range(limit):
+    response = client.get("/v0/changes/players/", params = {"limit": limit})
+    assert response.status_code == 422
+
+# test the bulk files in both formats
+def test_read_bulk_files():
+    response = client.get("/v0/bulk/player_data.csv")
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 1019
+    # sent as is, so the file's ETag names the bytes sent
+    gzip_response = client.get("/v0/bulk/player_data.csv", headers = {"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in gzip_response.headers
+    assert gzip_response.headers["etag"] == response.headers["etag"]
+
+    response = client.get("/v0/bulk/performance_data.parquet")
+    assert response.status_code == 200
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 17306
+
+    response = client.get("/v0/bulk/main.py")
+    assert response.status_code == 404
+
+# test repeat calls are served from the response cache until the data changes
+def test_read_leagues_cached(monkeypatch):
+    main.response_cache.clear()
+    first = client.get("/v0/leagues/?limit=3")
+    second = client.get("/v0/leagues/?limit=3")
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+    monkeypatch.setattr(main.crud, "get_data_version", lambda db, *tables: ("changed",))
+    third = client.get("/v0/leagues/?limit=3")
+    assert third.headers["X-Cache"] == "MISS"
+
+    stats = client.get("/v0/cache/stats/").json()
+    assert stats["hits"] >= 1
+    assert stats["invalidations"] >= 1
+
+# test polling counts between writes is served from the cache without counting tables
+def test_read_counts_hit_counts_nothing():
+    engine = database.async_engine.sync_engine if database.ASYNC_DB else database.engine
+    main.response_cache.clear()
+    client.get("/v0/counts/")
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/v0/counts/")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.headers["X-Cache"] == "HIT"
+    assert statements and "count(" not in " ".join(statements).lower()
+
+def test_conditional_get_returns_not_modified(monkeypatch):
+    main.response_cache.clear()
+    first = client.get("/v0/players/1001/", headers = {"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag == f'"{hashlib.sha256(first.content).hexdigest()[:32]}"'
+
+    # a match against the cached entry is answered without loading the player
+    monkeypatch.setattr(main.crud, "get_player", None)
+    second = client.get("/v0/players/1001/", headers = {"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+    assert client.get("/v0/players/1001/", headers = {"If-None-Match": "*"}).status_code == 304
+    monkeypatch.undo()
+
+    stale = client.get("/v0/players/1001/", headers = {"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+
+    # * only matches a resource that exists
+    missing = client.get("/v0/players/999999/", headers = {"If-None-Match": "*"})
+    assert missing.status_code == 404
+
+# test the ETag follows the body, not the day the data last changed
+def test_etag_changes_with_same_day_edit(scratch_db):
+    first = client.get("/v0/players/1001/")
+    with scratch_db() as db:
+        player = db.get(models.Player, 1001)
+        player.first_name = "Edited"
+        player.last_changed_date = datetime(2024, 4, 18)
+        db.commit()
+    second = client.get("/v0/players/1001/", headers = {"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()["first_name"] == "Edited"
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+def test_read_database_settings():
+    response = client.get("/v0/database/settings/")
+    assert response.status_code == 200
+    assert response.json()["dialect"] == "sqlite"
+    assert response.json()["pragmas"]["journal_mode"] == "wal"
+
+def test_read_analytics():
+    response = client.get("/v0/analytics/top_players/?season=2023&position=QB&limit=3")
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert response.json()[0]["position"] == "QB"
+
+    response = client.get("/v0/analytics/team_season_totals/?league_id=5001")
+    assert response.status_code == 200
+    assert {total["league_id"] for total in response.json()} == {5001}
+
+    response = client.get("/v0/analytics/weekly_averages/?season=2023")
+    assert len(response.json()) == 17
+
+# test the analytics only read, so replicas opened read-only can serve them
+@pytest.mark.parametrize("scratch_db", [True], indirect = True)
+def test_read_analytics_on_read_only_database(scratch_db):
+    response = client.get("/v0/analytics/top_players/?season=2023&limit=3")
+    assert response.status_code == 200
+    response = client.get("/v0/analytics/team_season_totals/?league_id=5001")
+    assert response.status_code == 200
+    response = client.get("/v0/analytics/player_season_totals/?player_id=1001")
+    assert response.status_code == 200
+
+def test_read_leaderboards():
+    response = client.get("/v0/leaderboards/leagues/5001")
+    assert response.status_code == 200
+    points = [standing["points"] for standing in response.json()]
+    assert points == sorted(points, reverse = True)
+    assert response.json()[0]["rank"] == 1
+
+    response = client.get("/v0/leaderboards/positions/QB?week_number=202301&limit=5")
+    assert len(response.json()) == 5
+    assert {leader["position"] for leader in response.json()} == {"QB"}
+
+# test routes run unchanged on an async session when ASYNC_DB is set
+def test_db_route_runs_on_async_session(monkeypatch):
+    async_engine = create_async_engine(database.get_async_url(database.SQLALCHEMY_DATABASE_URL))
+    monkeypatch.setattr(database, "ASYNC_DB", True)
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(async_engine))
+    route = main.db_route(inspect.unwrap(main.read_counts))
+    assert inspect.iscoroutinefunction(route)
+    assert "db" not in inspect.signature(route).parameters
+
+    async def call():
+        try:
+            return await route(request = Request({"type": "http", "headers": []}))
+        finally:
+            await async_engine.dispose()
+    response = asyncio.run(call())
+    assert json.loads(response.body)["player_count"] == 1018
+
+# test the async path serializes in the threadpool, leaving the event loop to database I/O
+def test_db_route_serializes_off_the_event_loop(monkeypatch):
+    async_engine = create_async_engine(database.get_async_url(database.SQLALCHEMY_DATABASE_URL))
+    monkeypatch.setattr(database, "ASYNC_DB", True)
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(async_engine))
+    threads = []
+    serialize = main._serialize
+    monkeypatch.setattr(main, "_serialize",
+                        lambda *args: threads.append(threading.get_ident()) or serialize(*args))
+    main.response_cache.clear()
+    route = main.db_route(inspect.unwrap(main.read_counts))
+
+    async def call():
+        try:
+            return await route(request = Request({"type": "http", "headers": []}))
+        finally:
+            await async_engine.dispose()
+    response = asyncio.run(call())
+    assert json.loads(response.body)["player_count"] == 1018
+    assert threads and threading.get_ident() not in threads
+
+# test the orjson fast path returns the same bytes as the pydantic path
+@pytest.mark.parametrize("url", ["/v0/players/?limit=50", "/v0/performances/?limit=500&skip=100"])
+def test_fast_json_matches_pydantic(monkeypatch, url):
+    main.response_cache.clear()
+    expected = client.get(url)
+    main.response_cache.clear()
+    monkeypatch.setattr(main, "FAST_JSON", True)
+    response = client.get(url)
+    assert response.content == expected.content
+    assert response.headers["X-Next-Cursor"] == expected.headers["X-Next-Cursor"]
+
+# test ndjson streams hold the same items as the json list, chosen by query or accept header
+@pytest.mark.parametrize("url", ["/v0/players/?limit=50", "/v0/performances/?limit=500&skip=100"])
+def test_stream_matches_list(url):
+    expected = client.get(url)
+    assert "Accept" in [value.strip() for value in expected.headers["vary"].split(",")]
+    expected = expected.json()
+    response = client.get(url + "&stream=true")
+    assert response.headers["content-type"] == main.NDJSON_MEDIA_TYPE
+    assert "Accept" in [value.strip() for value in response.headers["vary"].split(",")]
+    assert [json.loads(line) for line in response.iter_lines() if line] == expected
+    response = client.get(url, headers = {"Accept": main.NDJSON_MEDIA_TYPE})
+    assert [json.loads(line) for line in response.iter_lines() if line] == expected
+
+# test large cached bodies are compressed once per coding and reused from the cache
+def test_compressed_response_is_cached():
+    main.response_cache.clear()
+    url = "/v0/performances/?limit=500"
+    plain = client.get(url, headers = {"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    first = client.get(url, headers = {"Accept-Encoding": "gzip"})
+    second = client.get(url, headers = {"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+    assert second.headers["X-Cache"] == "HIT"
+    assert first.content == plain.content
+    assert int(first.headers["content-length"]) * 5 < len(plain.content)
+    assert first.headers["etag"] != plain.headers["etag"]
+    # small bodies are left alone
+    assert "content-encoding" not in client.get("/v0/counts/", headers = {"Accept-Encoding": "gzip"}).headers
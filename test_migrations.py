@@ -0,0 +1,69 @@
+#the pytest for the migrations of existing database files
+from sqlalchemy import create_engine, inspect
+from database import Base
+import migrations
+import models
+
+def test_upgrade_adds_missing_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind = engine)
+    # simulate a database file created before the indexes were declared
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind = engine)
+
+    created = migrations.upgrade(engine)
+    assert "ix_performance_player_id" in created
+    assert "ix_team_player_player_id" in created
+    index_names = {index["name"] for index in inspect(engine).get_indexes("player")}
+    assert {"ix_player_first_name", "ix_player_last_name", "ix_player_last_changed_date"} <= index_names
+
+    # running it again is a no-op
+    assert migrations.upgrade(engine) == []
+
+def test_upgrade_numbers_existing_rows_in_change_order(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind = engine)
+    # simulate a database file created before change_seq
+    with engine.begin() as connection:
+        for model in models.CHANGE_TRACKED:
+            name = model.__tablename__
+            for statement in migrations.drop_change_triggers(model.__table__, "sqlite"):
+                connection.exec_driver_sql(statement)
+            connection.exec_driver_sql(f"DROP INDEX ix_{name}_change_seq")
+            connection.exec_driver_sql(f"ALTER TABLE {name} DROP COLUMN change_seq")
+        connection.exec_driver_sql("DROP TABLE change_sequence")
+        connection.exec_driver_sql("INSERT INTO league VALUES (5002, 'B', 'PPR', '2024-04-02 00:00:00.000000'), "
+                                   "(5001, 'A', 'PPR', '2024-04-02 00:00:00.000000'), "
+                                   "(5003, 'C', 'PPR', '2024-04-01 00:00:00.000000')")
+
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        numbered = connection.exec_driver_sql("SELECT league_id, change_seq FROM league ORDER BY change_seq").all()
+        assert numbered == [(5003, 1), (5001, 2), (5002, 3)]
+        # writes after the upgrade carry on from the backfilled numbers
+        connection.exec_driver_sql("UPDATE league SET league_name = 'AA' WHERE league_id = 5001")
+        assert connection.exec_driver_sql("SELECT change_seq FROM league WHERE league_id = 5001").scalar() == 4
+    assert migrations.add_change_seq(engine) == []
+
+def test_upgrade_splits_single_change_counter(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind = engine)
+    # simulate a database file with the one change_sequence row of older versions
+    with engine.begin() as connection:
+        for model in models.CHANGE_TRACKED:
+            for statement in migrations.drop_change_triggers(model.__table__, "sqlite"):
+                connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("DROP TABLE change_sequence")
+        connection.exec_driver_sql("CREATE TABLE change_sequence (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO change_sequence VALUES (1, 7)")
+        connection.exec_driver_sql("INSERT INTO league VALUES (5001, 'A', 'PPR', '2024-04-02 00:00:00.000000', 7)")
+
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        counters = dict(connection.exec_driver_sql("SELECT table_name, value FROM change_sequence").all())
+        assert counters == {"league": 7, "team": 0, "player": 0, "team_player": 0, "performance": 0}
+        connection.exec_driver_sql("DELETE FROM league WHERE league_id = 5001")
+        assert connection.exec_driver_sql(
+            "SELECT value FROM change_sequence WHERE table_name = 'league'").scalar() == 8
+    assert not migrations.split_change_sequence(engine)
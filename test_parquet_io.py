@@ -0,0 +1,63 @@
+#the pytest for the parquet export and loader
+from datetime import date, datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import importer
+import migrations
+import models
+import parquet_io
+
+def test_export_and_load_round_trip(tmp_path):
+    with SessionLocal() as db:
+        paths = parquet_io.export_all(db, tmp_path / "parquet")
+
+    performances = pq.ParquetFile(paths["performance"])
+    schema = performances.schema_arrow
+    assert schema.field("week_number").type == pa.int32()
+    assert schema.field("last_changed_date").type == pa.date32()
+    assert performances.metadata.num_rows == 17306
+    assert performances.metadata.num_row_groups == 2
+    assert performances.metadata.row_group(0).column(0).compression == "ZSTD"
+    first = performances.read_row_group(0).slice(0, 1).to_pylist()[0]
+    assert first == {"performance_id": 2501, "week_number": 202301, "fantasy_points": 20,
+                     "player_id": 1001, "last_changed_date": date(2024, 3, 1)}
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    migrations.upgrade(engine)
+    counts = parquet_io.load_all(engine, tmp_path / "parquet")
+    assert counts == {"league": 5, "team": 20, "player": 1018,
+                      "team_player": 140, "performance": 17306}
+    with engine.connect() as connection:
+        performance = connection.execute(
+            select(models.Performance).where(models.Performance.performance_id == 2501)).one()
+    assert performance.week_number == "202301"
+    assert performance.last_changed_date == datetime(2024, 3, 1)
+
+def test_cached_export_follows_same_day_edit(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    migrations.upgrade(engine)
+    importer.load_all(engine)
+    with Session(engine) as db:
+        first = parquet_io.get_cached_export(db, models.Player, "player_data", tmp_path / "cache")
+        assert parquet_io.get_cached_export(db, models.Player, "player_data", tmp_path / "cache") == first
+
+        # same day, same row count, different data
+        player = db.get(models.Player, 1001)
+        player.last_name = "Edited"
+        player.last_changed_date = datetime(2024, 4, 18)
+        db.commit()
+        second = parquet_io.get_cached_export(db, models.Player, "player_data", tmp_path / "cache")
+        # the previous export stays for requests already handed its path
+        assert first.exists()
+
+        player.last_name = "Edited again"
+        db.commit()
+        third = parquet_io.get_cached_export(db, models.Player, "player_data", tmp_path / "cache")
+    assert second != first
+    assert not first.exists()
+    assert second.exists()
+    assert pq.read_table(second).slice(0, 1).to_pylist()[0]["last_name"] == "Edited"
+    assert pq.read_table(third).slice(0, 1).to_pylist()[0]["last_name"] == "Edited again"
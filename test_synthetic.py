@@ -0,0 +1,44 @@
+#the pytest for the synthetic dataset generator
+from sqlalchemy import create_engine, func, select
+import importer
+import migrations
+import models
+import parquet_io
+import synthetic
+
+def rows(scale, seasons, seed):
+    return {model.__tablename__: [row for batch in batches for row in batch]
+            for model, batches in synthetic.generate(scale, seasons, seed, batch_size = 1000)}
+
+def test_generate_is_deterministic_by_seed():
+    first = rows(1, 1, 7)
+    assert first == rows(1, 1, 7)
+    assert first != rows(1, 1, 8)
+    assert {table: len(items) for table, items in first.items()} == {
+        "league": 5, "team": 20, "player": 1018, "team_player": 140, "performance": 17306}
+
+    # more seasons add performances without changing the other tables
+    two_seasons = rows(1, 2, 7)
+    assert two_seasons["player"] == first["player"]
+    assert len(two_seasons["performance"]) == 2 * 17306
+    assert {row["week_number"][:4] for row in two_seasons["performance"]} == {"2022", "2023"}
+
+def test_write_db_is_referentially_consistent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'synthetic.db'}")
+    migrations.upgrade(engine)
+    counts = synthetic.write_db(engine, scale = 2, seed = 1)
+    assert counts == {"league": 10, "team": 40, "player": 2036,
+                      "team_player": 280, "performance": 34612}
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        # a player is on one team at most, and the leaderboards were rebuilt
+        assert connection.scalar(select(func.count(func.distinct(models.TeamPlayer.player_id)))) == 280
+        assert connection.scalar(select(func.count()).select_from(models.PlayerWeekScore)) == 34612
+
+def test_csv_and_parquet_files_load(tmp_path):
+    expected = synthetic.write_csv(tmp_path / "csv", seed = 3)
+    assert synthetic.write_parquet(tmp_path / "parquet", seed = 3) == expected
+    for name, load_all in (("csv", importer.load_all), ("parquet", parquet_io.load_all)):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        migrations.upgrade(engine)
+        assert load_all(engine, tmp_path / name) == expected